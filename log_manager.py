@@ -5,110 +5,216 @@ Provides tools to organize, clean, and analyze session-based logs.
 """
 import os
 import json
+import mmap
+import re
 import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
 import argparse
 
+try:
+    import ijson
+except ImportError:  # Streaming counts are optional; fall back to a full parse
+    ijson = None
+
+try:
+    import orjson
+except ImportError:  # Faster full parses are optional; fall back to json
+    orjson = None
+
+
+# Session directories are named "session_<session_id>"
+SESSION_PREFIX = "session_"
+SESSION_PREFIX_LEN = len(SESSION_PREFIX)
+
+# Top-level arrays whose length is reported as a JSON log's record count,
+# in order of precedence
+RECORD_ARRAY_KEYS = ("events", "trades", "funding_events")
+
+# JSON log files written per session, mapped to the summary statistic
+# they contribute and the array holding its records
+JSON_LOG_FILES = {
+    "detailed_logs.json": None,
+    "trade_logs.json": ("total_trades", "trades"),
+    "funding_logs.json": ("total_funding_events", "funding_events"),
+    "liquidation_logs.json": ("total_liquidations", "liquidation_events"),
+    "price_logs.json": ("total_price_updates", "price_updates"),
+    "order_logs.json": ("total_orders", "orders")
+}
+
+SESSION_LOG_FILES = frozenset(("simulation.log", *JSON_LOG_FILES))
+
+# Layout of the JSON logs written by TradingLogger (json.dump with indent=2):
+# top-level keys sit on lines indented by two spaces, and each record of the
+# single top-level array opens a line indented by exactly four spaces
+TOP_LEVEL_ARRAY_RE = re.compile(rb'\n  "(\w+)": \[')
+HEADER_TOTAL_RE = re.compile(rb'\n  "total_\w+": (\d+)')
+RECORD_START = b'\n    {'
+
 
 class LogManager:
     """Manages session-based logs for the trading simulator."""
     
-    def __init__(self, logs_dir: str = "logs", output_dir: str = "output"):
+    def __init__(self, logs_dir: str = "logs", output_dir: str = "output", fast_count: bool = True):
         self.logs_dir = logs_dir
         self.output_dir = output_dir
+        # Count records of simulator-written JSON logs with a byte scan instead of a parse
+        self.fast_count = fast_count
+        # Parsed JSON log counts keyed by path -> (mtime, size, records, statistic)
+        self._json_cache: Dict[str, Tuple[float, int, int, int]] = {}
+        # Last list_sessions result, keyed by the session directories' names and mtimes
+        self._sessions_cache: Optional[List[Dict]] = None
+        self._sessions_cache_key: Optional[Tuple[Tuple[str, float], ...]] = None
     
     def list_sessions(self) -> List[Dict]:
-        """List all available sessions."""
-        if not os.path.exists(self.logs_dir):
+        """List all available sessions.
+        
+        Results are cached per instance until a session directory is added,
+        removed or has files added or removed. Growth of an existing log file
+        does not change any directory mtime, so total_size and output_size
+        can lag behind files still being written; use a new LogManager for
+        exact sizes.
+        """
+        try:
+            with os.scandir(self.logs_dir) as it:
+                entries = [
+                    entry for entry in it
+                    if entry.name[:SESSION_PREFIX_LEN] == SESSION_PREFIX
+                    and entry.is_dir(follow_symlinks=False)
+                ]
+        except FileNotFoundError:
             return []
         
-        sessions = []
-        for item in os.listdir(self.logs_dir):
-            if item.startswith("session_"):
-                session_path = os.path.join(self.logs_dir, item)
-                if os.path.isdir(session_path):
-                    session_id = item.replace("session_", "")
-                    
-                    # Get session info
-                    session_info = self._get_session_info(session_path, session_id)
-                    sessions.append(session_info)
+        if not entries:
+            return []
         
-        # Sort by creation time (newest first)
-        sessions.sort(key=lambda x: x["created_at"], reverse=True)
-        return sessions
+        cache_key = tuple(sorted(
+            (entry.name, entry.stat(follow_symlinks=False).st_mtime) for entry in entries
+        ))
+        if self._sessions_cache is None or cache_key != self._sessions_cache_key:
+            # Stat-heavy and IO-bound, so gather session info in parallel
+            with ThreadPoolExecutor(max_workers=min(32, len(entries))) as executor:
+                sessions = list(executor.map(self._get_session_info, entries))
+            
+            # Sort by creation time (newest first)
+            sessions.sort(key=lambda x: x["created_at"], reverse=True)
+            
+            self._sessions_cache = sessions
+            self._sessions_cache_key = cache_key
+        
+        # Callers get copies so they cannot alter the cached entries
+        return [
+            {**session, "files": [dict(file_info) for file_info in session["files"]]}
+            for session in self._sessions_cache
+        ]
     
-    def _get_session_info(self, session_path: str, session_id: str) -> Dict:
-        """Get information about a session."""
+    def _invalidate_sessions_cache(self) -> None:
+        """Drop the cached list_sessions result."""
+        self._sessions_cache = None
+    
+    def _get_session_info(self, session_entry: os.DirEntry) -> Dict:
+        """Get information about a session from its directory entry."""
+        session_path = session_entry.path
+        session_id = session_entry.name[SESSION_PREFIX_LEN:]
         info = {
             "session_id": session_id,
             "path": session_path,
-            "created_at": datetime.fromtimestamp(os.path.getctime(session_path)),
+            "created_at": session_entry.stat(follow_symlinks=False).st_ctime,
             "files": [],
             "total_size": 0
         }
         
-        # List files in session directory
-        if os.path.exists(session_path):
-            for file in os.listdir(session_path):
-                file_path = os.path.join(session_path, file)
-                if os.path.isfile(file_path):
-                    file_size = os.path.getsize(file_path)
-                    info["files"].append({
-                        "name": file,
-                        "size": file_size,
-                        "modified": datetime.fromtimestamp(os.path.getmtime(file_path))
+        # List files in session directory (caller guarantees it exists)
+        files = info["files"]
+        with os.scandir(session_path) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    files.append({
+                        "name": entry.name,
+                        "size": st.st_size,
+                        "modified": st.st_mtime
                     })
-                    info["total_size"] += file_size
+                    info["total_size"] += st.st_size
         
         # Check for corresponding output directory
         output_session_path = os.path.join(self.output_dir, f"session_{session_id}")
-        if os.path.exists(output_session_path):
-            info["has_output"] = True
-            info["output_path"] = output_session_path
-            # Count output files
+        try:
             output_files = 0
             output_size = 0
-            for file in os.listdir(output_session_path):
-                file_path = os.path.join(output_session_path, file)
-                if os.path.isfile(file_path):
-                    output_files += 1
-                    output_size += os.path.getsize(file_path)
+            with os.scandir(output_session_path) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        output_files += 1
+                        output_size += st.st_size
+        except FileNotFoundError:
+            info["has_output"] = False
+        else:
+            info["has_output"] = True
+            info["output_path"] = output_session_path
             info["output_files"] = output_files
             info["output_size"] = output_size
-        else:
-            info["has_output"] = False
         
         return info
     
+    def _iter_session_ctimes(self) -> Iterator[Tuple[str, float, str]]:
+        """Yield (session_id, ctime, path) for each session without scanning its files."""
+        try:
+            with os.scandir(self.logs_dir) as it:
+                for entry in it:
+                    name = entry.name
+                    if name[:SESSION_PREFIX_LEN] == SESSION_PREFIX and entry.is_dir(follow_symlinks=False):
+                        ctime = entry.stat(follow_symlinks=False).st_ctime
+                        yield name[SESSION_PREFIX_LEN:], ctime, entry.path
+        except FileNotFoundError:
+            return
+    
     def clean_old_sessions(self, days: int = 7, dry_run: bool = True) -> List[str]:
         """Clean sessions older than specified days."""
-        cutoff_time = datetime.now().timestamp() - (days * 24 * 60 * 60)
-        sessions = self.list_sessions()
+        cutoff_time = time.time() - (days * 24 * 60 * 60)
         
-        sessions_to_remove = []
-        for session in sessions:
-            if session["created_at"].timestamp() < cutoff_time:
-                sessions_to_remove.append(session["session_id"])
-                
-                if not dry_run:
-                    session_path = session["path"]
-                    shutil.rmtree(session_path)
-                    
-                    # Also remove corresponding output directory
-                    output_session_path = os.path.join(self.output_dir, f"session_{session['session_id']}")
-                    if os.path.exists(output_session_path):
-                        shutil.rmtree(output_session_path)
-                        print(f"Removed session: {session['session_id']} (logs + output)")
-                    else:
-                        print(f"Removed session: {session['session_id']} (logs only)")
-        
-        return sessions_to_remove
+        # Newest first, matching list_sessions ordering
+        sessions_to_remove = sorted(
+            (session for session in self._iter_session_ctimes() if session[1] < cutoff_time),
+            key=lambda session: session[1],
+            reverse=True
+        )
+        
+        if not dry_run and sessions_to_remove:
+            self._invalidate_sessions_cache()
+            # Deletions are IO-bound, so remove sessions in parallel
+            with ThreadPoolExecutor(max_workers=min(8, len(sessions_to_remove))) as executor:
+                for message in executor.map(self._remove_session, sessions_to_remove):
+                    print(message)
+        
+        return [session_id for session_id, _, _ in sessions_to_remove]
+    
+    def _remove_session(self, session: Tuple[str, float, str]) -> str:
+        """Remove a session's logs and corresponding output directory."""
+        session_id, _, session_path = session
+        _fast_rmtree(session_path)
+        
+        # Also remove corresponding output directory
+        output_session_path = os.path.join(self.output_dir, f"session_{session_id}")
+        if os.path.exists(output_session_path):
+            _fast_rmtree(output_session_path)
+            return f"Removed session: {session_id} (logs + output)"
+        return f"Removed session: {session_id} (logs only)"
     
     def get_session_summary(self, session_id: str) -> Optional[Dict]:
         """Get a summary of a specific session."""
         session_path = os.path.join(self.logs_dir, f"session_{session_id}")
-        if not os.path.exists(session_path):
+        
+        # One directory read instead of probing every known log file
+        try:
+            with os.scandir(session_path) as it:
+                present = {entry.name: entry for entry in it if entry.name in SESSION_LOG_FILES}
+        except (FileNotFoundError, NotADirectoryError):
             return None
         
         summary = {
@@ -118,67 +224,166 @@ class LogManager:
             "statistics": {}
         }
         
-        # Read simulation log
-        log_file = os.path.join(session_path, "simulation.log")
-        if os.path.exists(log_file):
-            summary["files"]["simulation_log"] = {
-                "exists": True,
-                "size": os.path.getsize(log_file),
-                "lines": self._count_lines(log_file)
-            }
-        
-        # Read JSON logs
-        json_files = [
-            "detailed_logs.json",
-            "trade_logs.json", 
-            "funding_logs.json",
-            "liquidation_logs.json",
-            "price_logs.json",
-            "order_logs.json"
+        json_entries = [
+            (json_file, statistic, present[json_file])
+            for json_file, statistic in JSON_LOG_FILES.items()
+            if json_file in present
         ]
+        log_entry = present.get("simulation.log")
         
-        for json_file in json_files:
-            file_path = os.path.join(session_path, json_file)
-            if os.path.exists(file_path):
+        # Line counting and JSON parsing are independent and IO-bound, so overlap them
+        with ThreadPoolExecutor(max_workers=len(json_entries) + 1) as executor:
+            lines_future = (
+                executor.submit(self._count_lines, log_entry.path) if log_entry is not None else None
+            )
+            json_futures = []
+            for json_file, statistic, entry in json_entries:
+                st = entry.stat(follow_symlinks=False)
+                future = executor.submit(
+                    self._get_json_counts, entry.path, st, statistic[1] if statistic else None
+                )
+                json_futures.append((json_file, statistic, st, future))
+            
+            # Read simulation log
+            if lines_future is not None:
+                summary["files"]["simulation_log"] = {
+                    "exists": True,
+                    "size": log_entry.stat(follow_symlinks=False).st_size,
+                    "lines": lines_future.result()
+                }
+            
+            # Read JSON logs
+            for json_file, statistic, st, future in json_futures:
                 try:
-                    with open(file_path, 'r') as f:
-                        data = json.load(f)
+                    records, statistic_count = future.result()
                     
                     summary["files"][json_file] = {
                         "exists": True,
-                        "size": os.path.getsize(file_path),
-                        "records": len(data.get("events", data.get("trades", data.get("funding_events", []))))
+                        "size": st.st_size,
+                        "records": records
                     }
                     
                     # Extract statistics
-                    if json_file == "trade_logs.json":
-                        summary["statistics"]["total_trades"] = len(data.get("trades", []))
-                    elif json_file == "funding_logs.json":
-                        summary["statistics"]["total_funding_events"] = len(data.get("funding_events", []))
-                    elif json_file == "liquidation_logs.json":
-                        summary["statistics"]["total_liquidations"] = len(data.get("liquidation_events", []))
-                    elif json_file == "price_logs.json":
-                        summary["statistics"]["total_price_updates"] = len(data.get("price_updates", []))
-                    elif json_file == "order_logs.json":
-                        summary["statistics"]["total_orders"] = len(data.get("orders", []))
+                    if statistic:
+                        summary["statistics"][statistic[0]] = statistic_count
                         
                 except Exception as e:
                     summary["files"][json_file] = {
                         "exists": True,
-                        "size": os.path.getsize(file_path),
+                        "size": st.st_size,
                         "error": str(e)
                     }
         
         return summary
     
+    def _get_json_counts(
+        self, 
+        file_path: str, 
+        st: os.stat_result, 
+        array_key: Optional[str]
+    ) -> Tuple[int, int]:
+        """Get the record count and statistic count of a JSON log, reusing cached parses."""
+        cached = self._json_cache.get(file_path)
+        if cached and cached[0] == st.st_mtime and cached[1] == st.st_size:
+            return cached[2], cached[3]
+        
+        wanted_keys = RECORD_ARRAY_KEYS + ((array_key,) if array_key else ())
+        counts = self._fast_count_json_arrays(file_path) if self.fast_count else None
+        if counts is None:
+            counts = self._count_json_arrays(file_path, wanted_keys)
+        
+        records = next((counts[key] for key in RECORD_ARRAY_KEYS if key in counts), 0)
+        statistic_count = counts.get(array_key, 0) if array_key else 0
+        
+        self._json_cache[file_path] = (st.st_mtime, st.st_size, records, statistic_count)
+        return records, statistic_count
+    
+    def _fast_count_json_arrays(self, file_path: str) -> Optional[Dict[str, int]]:
+        """Count the records of a simulator-written JSON log without parsing it.
+        
+        Relies on the layout TradingLogger writes: a single top-level array
+        whose records each start on a line indented by four spaces. The byte
+        count is checked against the log's "total_*" header, and None is
+        returned when the file does not match so callers can fall back to a
+        full parse.
+        """
+        with open(file_path, 'rb') as f:
+            buf = f.read()
+        
+        arrays = TOP_LEVEL_ARRAY_RE.findall(buf)
+        header = HEADER_TOTAL_RE.search(buf, 0, 1024)
+        if len(arrays) != 1 or header is None:
+            return None
+        
+        count = buf.count(RECORD_START)
+        if count != int(header.group(1)):
+            return None
+        return {arrays[0].decode(): count}
+    
+    def _count_json_arrays(self, file_path: str, keys: Tuple[str, ...]) -> Dict[str, int]:
+        """Count the items of the given top-level arrays in a JSON file.
+        
+        Uses ijson to stream the document when available so only the counts
+        are held in memory; otherwise the whole document is loaded, with
+        orjson if installed.
+        """
+        if ijson is None:
+            if orjson is not None:
+                with open(file_path, 'rb') as f:
+                    data = orjson.loads(f.read())
+            else:
+                with open(file_path, 'r') as f:
+                    data = json.load(f)
+            return {key: len(data[key]) for key in keys if isinstance(data.get(key), list)}
+        
+        item_prefixes = {f"{key}.item": key for key in keys}
+        counts: Dict[str, int] = {}
+        with open(file_path, 'rb') as f:
+            for prefix, event, _ in ijson.parse(f):
+                if event == "start_array" and prefix in keys:
+                    counts[prefix] = 0
+                elif prefix in item_prefixes and event not in ("map_key", "end_map", "end_array"):
+                    # Each item starts with exactly one start_map/start_array or scalar event
+                    counts[item_prefixes[prefix]] += 1
+        return counts
+    
     def _count_lines(self, file_path: str) -> int:
         """Count lines in a file."""
         try:
-            with open(file_path, 'r') as f:
-                return sum(1 for _ in f)
-        except:
+            with open(file_path, 'rb', buffering=0) as f:
+                try:
+                    # Slice straight from the page cache instead of read() syscalls
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        if hasattr(mm, "madvise"):
+                            mm.madvise(mmap.MADV_SEQUENTIAL)
+                        size = len(mm)
+                        count = sum(
+                            mm[start:start + (1 << 20)].count(b'\n')
+                            for start in range(0, size, 1 << 20)
+                        )
+                        last_byte = mm[-1:]
+                except ValueError:
+                    # Empty files cannot be mapped
+                    return 0
+                except OSError:
+                    count, last_byte = self._count_lines_chunked(f)
+            # A trailing line without a newline still counts as a line
+            if last_byte and last_byte != b'\n':
+                count += 1
+            return count
+        except OSError:
             return 0
     
+    def _count_lines_chunked(self, f) -> Tuple[int, bytes]:
+        """Count newlines by reading 1 MB chunks, returning the count and the last byte."""
+        count = 0
+        last_chunk = b""
+        read = f.read
+        while chunk := read(1 << 20):
+            count += chunk.count(b'\n')
+            last_chunk = chunk
+        return count, last_chunk[-1:]
+    
     def export_session(self, session_id: str, output_dir: str) -> bool:
         """Export a session to a specific directory."""
         session_path = os.path.join(self.logs_dir, f"session_{session_id}")
@@ -187,16 +392,17 @@ class LogManager:
         
         # Create output directory
         os.makedirs(output_dir, exist_ok=True)
+        self._invalidate_sessions_cache()
         
         # Copy session directory
         dest_path = os.path.join(output_dir, f"session_{session_id}")
-        shutil.copytree(session_path, dest_path)
+        _fast_copytree(session_path, dest_path)
         
         # Also copy output directory if it exists
         output_session_path = os.path.join(self.output_dir, f"session_{session_id}")
         if os.path.exists(output_session_path):
             dest_output_path = os.path.join(output_dir, f"session_{session_id}_output")
-            shutil.copytree(output_session_path, dest_output_path)
+            _fast_copytree(output_session_path, dest_output_path)
             print(f"Exported session {session_id} to {dest_path} (logs + output)")
         else:
             print(f"Exported session {session_id} to {dest_path} (logs only)")
@@ -227,6 +433,36 @@ class LogManager:
         }
 
 
+def _fast_rmtree(path: str) -> None:
+    """Remove a directory tree, delegating to rm -rf on POSIX systems."""
+    if os.name == "posix":
+        subprocess.run(["rm", "-rf", "--", path], check=True)
+    else:
+        shutil.rmtree(path)
+
+
+def _fast_copytree(src: str, dst: str) -> None:
+    """Copy a directory tree, using cp (with copy-on-write clones where supported)."""
+    if os.path.exists(dst):
+        raise FileExistsError(f"Destination already exists: {dst}")
+    
+    if sys.platform.startswith("linux"):
+        command = ["cp", "-a", "--reflink=auto", "--", src, dst]
+    elif sys.platform == "darwin":
+        command = ["cp", "-R", "-c", "--", src, dst]
+    else:
+        shutil.copytree(src, dst, copy_function=shutil.copy2)
+        return
+    
+    try:
+        subprocess.run(command, check=True, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        # Fall back to a pure-Python copy, discarding any partial cp output
+        if os.path.exists(dst):
+            shutil.rmtree(dst)
+        shutil.copytree(src, dst, copy_function=shutil.copy2)
+
+
 def format_size(size_bytes: int) -> str:
     """Format size in human readable format."""
     if size_bytes < 1024:
@@ -262,19 +498,29 @@ def main():
             print("No sessions found.")
             return
         
+        lines = []
+        append = lines.append
         for session in sessions:
-            print(f"Session ID: {session['session_id']}")
-            print(f"Created: {session['created_at'].strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"Log Files: {len(session['files'])} ({format_size(session['total_size'])})")
+            file_count = len(session['files'])
+            log_size = session['total_size']
+            append(f"Session ID: {session['session_id']}")
+            append(f"Created: {datetime.fromtimestamp(session['created_at']).strftime('%Y-%m-%d %H:%M:%S')}")
+            append(f"Log Files: {file_count} ({format_size(log_size)})")
             if session.get("has_output", False):
-                print(f"Output Files: {session.get('output_files', 0)} ({format_size(session.get('output_size', 0))})")
-                print(f"Total: {len(session['files']) + session.get('output_files', 0)} files ({format_size(session['total_size'] + session.get('output_size', 0))})")
+                output_files = session.get('output_files', 0)
+                output_size = session.get('output_size', 0)
+                append(f"Output Files: {output_files} ({format_size(output_size)})")
+                append(f"Total: {file_count + output_files} files ({format_size(log_size + output_size)})")
             else:
-                print("Output Files: None")
-            print(f"Log Path: {session['path']}")
+                append("Output Files: None")
+            append(f"Log Path: {session['path']}")
             if session.get("has_output", False):
-                print(f"Output Path: {session['output_path']}")
-            print("-" * 40)
+                append(f"Output Path: {session['output_path']}")
+            append("-" * 40)
+        
+        # One write instead of a print (and stdout lock) per line
+        lines.append("")
+        sys.stdout.write("\n".join(lines))
     
     elif args.summary:
         print(f"📊 Session Summary: {args.summary}")
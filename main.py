@@ -3,19 +3,144 @@ JSON input/output system for configuration and results.
 """
 import json
 import argparse
-from typing import Dict, List, Any
+import csv
+import itertools
+from typing import Dict, Iterable, List, Any
 from decimal import Decimal
 from datetime import datetime
 import sqlite3
 import os
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # Faster encoding is optional; fall back to json
+    orjson = None
 
 from src.simulator import TradingSimulator
 from src.engine.price_oracle import PriceDataGenerator
 
 
+def _write_json(obj: Any, filename: str, default=None) -> None:
+    """Write obj to filename as indented JSON, with orjson when installed."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        _write_bytes(filename, orjson.dumps(obj, default=default, option=option))
+    else:
+        with open(filename, 'w') as f:
+            json.dump(obj, f, indent=2, default=default)
+
+
+def _json_default(obj: Any) -> Any:
+    """Encode values the JSON encoders do not handle natively."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if hasattr(obj, '__dict__'):
+        # Objects export their public attributes, as in clean_for_json
+        return {name: value for name, value in vars(obj).items() if not name.startswith('_')}
+    return str(obj)
+
+
+def _write_bytes(filename: str, data: bytes, chunk_size: int = 1 << 20) -> None:
+    """Write data to filename straight through the file descriptor in chunks."""
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view[:chunk_size])
+            view = view[written:]
+    finally:
+        os.close(fd)
+
+
+def _write_ndjson(filename: str, records: Iterable[Any], default=None) -> None:
+    """Write records to filename as newline-delimited JSON, one record per line."""
+    if orjson is not None:
+        dumps = orjson.dumps
+        option = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+        with open(filename, 'wb') as f:
+            f.writelines(dumps(record, default=default, option=option) for record in records)
+    else:
+        encode = json.JSONEncoder(separators=(",", ":"), default=default).encode
+        with open(filename, 'w') as f:
+            f.writelines(encode(record) + "\n" for record in records)
+
+
+def _read_json(filename: str) -> Any:
+    """Read a JSON document from filename, with orjson when installed."""
+    if orjson is not None:
+        with open(filename, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+# Scenario users as (user_id, collateral) and events as ("place_order", time,
+# user, side, quantity, price, leverage) or ("apply_funding", time)
+_SAMPLE_USERS = (("user1", 10000), ("user2", 5000), ("user3", 15000))
+_SAMPLE_EVENTS = (
+    ("place_order", 0, "user1", "buy", 0.5, 59500, 5),
+    ("place_order", 1, "user2", "sell", 0.3, 60500, 3),
+    ("apply_funding", 8),
+    ("apply_funding", 16),
+    ("place_order", 24, "user3", "buy", 1.0, 58000, 10),
+    ("apply_funding", 32),
+    ("apply_funding", 40)
+)
+
+_CRASH_USERS = (("trader1", 20000), ("trader2", 10000), ("trader3", 5000))
+_CRASH_EVENTS = (
+    ("place_order", 0, "trader1", "buy", 2.0, 60000, 10),
+    ("place_order", 5, "trader2", "buy", 1.5, 61000, 8),
+    ("place_order", 10, "trader3", "buy", 1.0, 62000, 10),
+    ("apply_funding", 8),
+    ("apply_funding", 16),
+    ("apply_funding", 24),
+    ("apply_funding", 32),
+    ("apply_funding", 40)
+)
+
+_PUMP_USERS = (("bull1", 15000), ("bear1", 12000), ("neutral1", 8000))
+_PUMP_EVENTS = (
+    ("place_order", 0, "bull1", "buy", 1.5, 60000, 5),
+    ("place_order", 2, "bear1", "sell", 1.0, 61000, 6),
+    ("place_order", 4, "neutral1", "buy", 0.8, 60500, 4),
+    ("apply_funding", 8),
+    ("apply_funding", 16),
+    ("apply_funding", 24),
+    ("apply_funding", 32),
+    ("apply_funding", 40)
+)
+
+
 class ConfigManager:
     """Manages simulation configuration and data generation."""
     
+    @staticmethod
+    def _build_config(users, events, prices) -> Dict:
+        """Build a configuration from scenario user and event specs and a price series."""
+        config_events = []
+        for action, time, *order in events:
+            event = {"time": time, "action": action}
+            if order:
+                user, side, quantity, price, leverage = order
+                event["data"] = {
+                    "user": user,
+                    "side": side,
+                    "quantity": quantity,
+                    "price": price,
+                    "leverage": leverage
+                }
+            config_events.append(event)
+        
+        return {
+            "users": [{"id": user_id, "collateral": collateral} for user_id, collateral in users],
+            "prices": list(map(float, prices)),
+            "events": config_events
+        }
+    
     @staticmethod
     def create_sample_config() -> Dict:
         """Create a sample configuration file."""
@@ -27,67 +152,7 @@ class ConfigManager:
             volatility=0.03
         )
         
-        config = {
-            "users": [
-                {"id": "user1", "collateral": 10000},
-                {"id": "user2", "collateral": 5000},
-                {"id": "user3", "collateral": 15000}
-            ],
-            "prices": [float(price) for price in prices],
-            "events": [
-                {
-                    "time": 0,
-                    "action": "place_order",
-                    "data": {
-                        "user": "user1",
-                        "side": "buy",
-                        "quantity": 0.5,
-                        "price": 59500,
-                        "leverage": 5
-                    }
-                },
-                {
-                    "time": 1,
-                    "action": "place_order",
-                    "data": {
-                        "user": "user2",
-                        "side": "sell",
-                        "quantity": 0.3,
-                        "price": 60500,
-                        "leverage": 3
-                    }
-                },
-                {
-                    "time": 8,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 16,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 24,
-                    "action": "place_order",
-                    "data": {
-                        "user": "user3",
-                        "side": "buy",
-                        "quantity": 1.0,
-                        "price": 58000,
-                        "leverage": 10
-                    }
-                },
-                {
-                    "time": 32,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 40,
-                    "action": "apply_funding"
-                }
-            ]
-        }
-        
-        return config
+        return ConfigManager._build_config(_SAMPLE_USERS, _SAMPLE_EVENTS, prices)
     
     @staticmethod
     def create_crash_scenario_config() -> Dict:
@@ -99,71 +164,7 @@ class ConfigManager:
             crash_percent=0.3
         )
         
-        config = {
-            "users": [
-                {"id": "trader1", "collateral": 20000},
-                {"id": "trader2", "collateral": 10000},
-                {"id": "trader3", "collateral": 5000}
-            ],
-            "prices": [float(price) for price in prices],
-            "events": [
-                {
-                    "time": 0,
-                    "action": "place_order",
-                    "data": {
-                        "user": "trader1",
-                        "side": "buy",
-                        "quantity": 2.0,
-                        "price": 60000,
-                        "leverage": 10
-                    }
-                },
-                {
-                    "time": 5,
-                    "action": "place_order",
-                    "data": {
-                        "user": "trader2",
-                        "side": "buy",
-                        "quantity": 1.5,
-                        "price": 61000,
-                        "leverage": 8
-                    }
-                },
-                {
-                    "time": 10,
-                    "action": "place_order",
-                    "data": {
-                        "user": "trader3",
-                        "side": "buy",
-                        "quantity": 1.0,
-                        "price": 62000,
-                        "leverage": 10
-                    }
-                },
-                {
-                    "time": 8,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 16,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 24,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 32,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 40,
-                    "action": "apply_funding"
-                }
-            ]
-        }
-        
-        return config
+        return ConfigManager._build_config(_CRASH_USERS, _CRASH_EVENTS, prices)
     
     @staticmethod
     def create_pump_scenario_config() -> Dict:
@@ -175,78 +176,13 @@ class ConfigManager:
             pump_percent=0.2
         )
         
-        config = {
-            "users": [
-                {"id": "bull1", "collateral": 15000},
-                {"id": "bear1", "collateral": 12000},
-                {"id": "neutral1", "collateral": 8000}
-            ],
-            "prices": [float(price) for price in prices],
-            "events": [
-                {
-                    "time": 0,
-                    "action": "place_order",
-                    "data": {
-                        "user": "bull1",
-                        "side": "buy",
-                        "quantity": 1.5,
-                        "price": 60000,
-                        "leverage": 5
-                    }
-                },
-                {
-                    "time": 2,
-                    "action": "place_order",
-                    "data": {
-                        "user": "bear1",
-                        "side": "sell",
-                        "quantity": 1.0,
-                        "price": 61000,
-                        "leverage": 6
-                    }
-                },
-                {
-                    "time": 4,
-                    "action": "place_order",
-                    "data": {
-                        "user": "neutral1",
-                        "side": "buy",
-                        "quantity": 0.8,
-                        "price": 60500,
-                        "leverage": 4
-                    }
-                },
-                {
-                    "time": 8,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 16,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 24,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 32,
-                    "action": "apply_funding"
-                },
-                {
-                    "time": 40,
-                    "action": "apply_funding"
-                }
-            ]
-        }
-        
-        return config
+        return ConfigManager._build_config(_PUMP_USERS, _PUMP_EVENTS, prices)
     
     @staticmethod
     def save_config(config: Dict, filename: str) -> Dict:
         """Save configuration to JSON file."""
         try:
-            with open(filename, 'w') as f:
-                json.dump(config, f, indent=2)
+            _write_json(config, filename)
             
             return {"success": True, "message": f"Configuration saved to {filename}"}
             
@@ -257,8 +193,7 @@ class ConfigManager:
     def load_config(filename: str) -> Dict:
         """Load configuration from JSON file."""
         try:
-            with open(filename, 'r') as f:
-                config = json.load(f)
+            config = _read_json(filename)
             
             return {"success": True, "config": config}
             
@@ -266,60 +201,282 @@ class ConfigManager:
             return {"success": False, "message": f"Error loading config: {str(e)}"}
 
 
+# Config factories for --scenario; sample is also the default
+_SCENARIO_CONFIGS = {
+    "sample": ConfigManager.create_sample_config,
+    "crash": ConfigManager.create_crash_scenario_config,
+    "pump": ConfigManager.create_pump_scenario_config,
+}
+
+
+def _clean_scalar(value, depth, stack):
+    return value
+
+
+def _clean_float(value, depth, stack):
+    # Handle special float values
+    if value == float('inf'):
+        return "infinity"
+    elif value == float('-inf'):
+        return "-infinity"
+    elif value != value:  # NaN check
+        return "NaN"
+    return value
+
+
+def _clean_decimal(value, depth, stack):
+    try:
+        return float(value)
+    except:
+        return str(value)
+
+
+def _clean_dict(value, depth, stack):
+    cleaned = dict.fromkeys(str(k) for k in value)
+    stack.extend((v, depth + 1, cleaned, str(k)) for k, v in reversed(value.items()))
+    return cleaned
+
+
+def _clean_list(value, depth, stack):
+    # Limit list size to prevent huge arrays
+    limited_list = value[:200] if len(value) > 200 else value
+    cleaned = [None] * len(limited_list)
+    stack.extend((item, depth + 1, cleaned, i) for i, item in reversed(list(enumerate(limited_list))))
+    return cleaned
+
+
+def _clean_object(value, depth, stack):
+    # Convert objects to dict representation, skipping private attributes
+    try:
+        attrs = {name: attr for name, attr in value.__dict__.items() if not name.startswith('_')}
+    except:
+        return str(value)
+    cleaned = dict.fromkeys(attrs)
+    stack.extend((attr, depth + 1, cleaned, name) for name, attr in reversed(attrs.items()))
+    return cleaned
+
+
+def _clean_other(value, depth, stack):
+    # Subclasses and other types, checked in the original order of precedence
+    if isinstance(value, dict):
+        return _clean_dict(value, depth, stack)
+    elif isinstance(value, list):
+        return _clean_list(value, depth, stack)
+    elif hasattr(value, '__dict__'):
+        return _clean_object(value, depth, stack)
+    elif isinstance(value, float):
+        return _clean_float(value, depth, stack)
+    elif isinstance(value, (str, int, bool, type(None))):
+        return value
+    elif isinstance(value, Decimal):
+        return _clean_decimal(value, depth, stack)
+    try:
+        return str(value)
+    except:
+        return "[Unserializable object]"
+
+
+# SQLite export statements, shared by every export so sqlite3's statement cache hits
+_INSERT_SUMMARY_SQL = (
+    "INSERT INTO simulation_summary (total_hours, final_price, price_change_percent, "
+    "total_trades, total_volume, total_funding_paid, total_liquidations) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_TRADE_SQL = (
+    "INSERT INTO trades (timestamp, hour, buyer, seller, quantity, price, trade_value) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_PRICE_SQL = "INSERT INTO price_history (timestamp, hour, price) VALUES (?, ?, ?)"
+_INSERT_FUNDING_SQL = (
+    "INSERT INTO funding_events (timestamp, hour, applied, funding_rate, total_funding_paid) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+_INSERT_POSITION_SQL = (
+    "INSERT INTO user_positions (timestamp, hour, user_id, collateral, realized_pnl, "
+    "unrealized_pnl, total_equity, position_side, position_quantity, entry_price, "
+    "leverage, margin_ratio, is_liquidatable) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+# Exact-type handlers for ResultsExporter.clean_for_json
+_CLEAN_DISPATCH = {
+    dict: _clean_dict,
+    list: _clean_list,
+    str: _clean_scalar,
+    int: _clean_scalar,
+    bool: _clean_scalar,
+    type(None): _clean_scalar,
+    float: _clean_float,
+    Decimal: _clean_decimal,
+}
+
+
+def _extract_trades(log_entry: Dict, history: Dict[str, List[Dict]]) -> None:
+    result_data = log_entry.get("data", {}).get("result", {})
+    trades = result_data.get("trades") if result_data.get("valid") else None
+    if trades is not None:
+        timestamp = log_entry.get("timestamp", "")
+        hour = log_entry.get("hour", 0)
+        append = history["trade_history"].append
+        for trade in trades:
+            append({
+                "timestamp": timestamp,
+                "hour": hour,
+                "buyer": trade.get("buyer", ""),
+                "seller": trade.get("seller", ""),
+                "quantity": trade.get("quantity", 0),
+                "price": trade.get("price", 0)
+            })
+
+
+def _extract_price(log_entry: Dict, history: Dict[str, List[Dict]]) -> None:
+    history["price_history"].append({
+        "timestamp": log_entry.get("timestamp", ""),
+        "hour": log_entry.get("hour", 0),
+        "price": log_entry.get("data", {}).get("new_price", 0)
+    })
+
+
+def _extract_funding(log_entry: Dict, history: Dict[str, List[Dict]]) -> None:
+    data = log_entry.get("data", {})
+    history["funding_events"].append({
+        "timestamp": log_entry.get("timestamp", ""),
+        "hour": log_entry.get("hour", 0),
+        "applied": data.get("applied", False),
+        "funding_rate": data.get("funding_rate", 0),
+        "total_funding_paid": data.get("total_funding_paid", 0)
+    })
+
+
+def _extract_hourly_summary(log_entry: Dict, history: Dict[str, List[Dict]]) -> None:
+    timestamp = log_entry.get("timestamp", "")
+    hour = log_entry.get("hour", 0)
+    data = log_entry.get("data", {})
+    
+    if data.get("liquidations", 0) > 0:
+        history["liquidation_events"].append({
+            "timestamp": timestamp,
+            "hour": hour,
+            "liquidations_count": data.get("liquidations", 0)
+        })
+    
+    append = history["user_position_history"].append
+    for user_id, summary in data.get("user_summaries", {}).items():
+        if summary and summary.get("has_position"):
+            append({
+                "timestamp": timestamp,
+                "hour": hour,
+                "user_id": user_id,
+                "collateral": summary.get("collateral", 0),
+                "realized_pnl": summary.get("realized_pnl", 0),
+                "unrealized_pnl": summary.get("unrealized_pnl", 0),
+                "total_equity": summary.get("total_equity", 0),
+                "position_side": summary.get("position_side", ""),
+                "position_quantity": summary.get("position_quantity", 0),
+                "entry_price": summary.get("entry_price", 0),
+                "leverage": summary.get("leverage", 1),
+                "margin_ratio": summary.get("margin_ratio", 0),
+                "is_liquidatable": summary.get("is_liquidatable", False)
+            })
+
+
+# History tables produced by ResultsExporter._extract_all, in export order
+_HISTORY_KEYS = (
+    "trade_history",
+    "price_history",
+    "funding_events",
+    "liquidation_events",
+    "user_position_history"
+)
+
+# Simulation log event_type -> extractor appending to the history tables
+_EXTRACT_HANDLERS = {
+    "order_placed": _extract_trades,
+    "random_order": _extract_trades,  # Random orders can produce trades too
+    "price_update": _extract_price,
+    "funding_applied": _extract_funding,
+    "hourly_summary": _extract_hourly_summary,
+}
+
+
+# Columns of the CSV trade history export
+_TRADE_HISTORY_FIELDS = ("timestamp", "hour", "buyer", "seller", "quantity", "price")
+
+# Summary report layout, filled by ResultsExporter.export_summary_report
+_REPORT_TEMPLATE = """
+PERPETUAL FUTURES TRADING SIMULATION REPORT
+==========================================
+
+Simulation Summary:
+- Total Hours: {summary[total_hours]}
+- Final Price: ${summary[final_price]:,.2f}
+- Price Change: {summary[price_change_percent]:.2f}%
+- Total Trades: {summary[total_trades]}
+- Total Volume: ${summary[total_volume]:,.2f}
+- Total Funding Paid: ${summary[total_funding_paid]:,.2f}
+- Total Liquidations: {summary[total_liquidations]}
+
+Execution Statistics:
+- Average Trade Size: ${exec_stats[average_trade_size]:,.2f}
+- Filled Orders: {exec_stats[filled_orders]}
+- Partially Filled Orders: {exec_stats[partially_filled_orders]}
+
+Funding Statistics:
+- Total Funding Events: {funding_stats[total_funding_events]}
+- Average Funding Rate: {funding_stats[average_funding_rate]:.6f}
+- Max Funding Rate: {funding_stats[max_funding_rate]:.6f}
+- Min Funding Rate: {funding_stats[min_funding_rate]:.6f}
+
+Liquidation Statistics:
+- Total Liquidations: {liquidation_stats[total_liquidations]}
+- Total Liquidation Fees: ${liquidation_stats[total_liquidation_fees]:,.2f}
+- Total Collateral Lost: ${liquidation_stats[total_collateral_lost]:,.2f}
+- Average Liquidation Size: ${liquidation_stats[average_liquidation_size]:,.2f}
+
+Price Statistics:
+- Volatility: {price_stats[volatility]:.4f}
+- Min Price: ${price_stats[min_price]:,.2f}
+- Max Price: ${price_stats[max_price]:,.2f}
+- Data Points: {price_stats[data_points]}
+
+Final User Balances:
+"""
+
+_REPORT_USER_TEMPLATE = """
+{user_id}:
+  Collateral: ${balance[collateral]:,.2f}
+  Realized PNL: ${balance[realized_pnl]:,.2f}
+  Unrealized PNL: ${balance[unrealized_pnl]:,.2f}
+  Total Equity: ${balance[total_equity]:,.2f}
+  Has Position: {balance[has_position]}
+"""
+
+# Price statistics may be missing when no prices were recorded
+_REPORT_PRICE_DEFAULTS = {"volatility": 0, "min_price": 0, "max_price": 0, "data_points": 0}
+
+
 class ResultsExporter:
     """Exports simulation results in various formats."""
     
     @staticmethod
     def clean_for_json(obj, max_depth=30, current_depth=0):
         """Clean object for JSON serialization, handling circular references."""
-        if current_depth > max_depth:
-            return "[Max depth reached]"
-        
-        if isinstance(obj, dict):
-            cleaned_dict = {}
-            for k, v in obj.items():
-                try:
-                    cleaned_dict[str(k)] = ResultsExporter.clean_for_json(v, max_depth, current_depth + 1)
-                except:
-                    cleaned_dict[str(k)] = str(v)
-            return cleaned_dict
-        elif isinstance(obj, list):
-            # Limit list size to prevent huge arrays
-            limited_list = obj[:200] if len(obj) > 200 else obj
-            return [ResultsExporter.clean_for_json(item, max_depth, current_depth + 1) 
-                   for item in limited_list]
-        elif hasattr(obj, '__dict__'):
-            # Convert objects to dict representation, but be more careful
-            try:
-                obj_dict = {}
-                for attr_name, attr_value in obj.__dict__.items():
-                    if not attr_name.startswith('_'):  # Skip private attributes
-                        obj_dict[attr_name] = ResultsExporter.clean_for_json(attr_value, max_depth, current_depth + 1)
-                return obj_dict
-            except:
-                return str(obj)
-        elif isinstance(obj, (str, int, float, bool, type(None))):
-            # Handle special float values
-            if isinstance(obj, float):
-                if obj == float('inf'):
-                    return "infinity"
-                elif obj == float('-inf'):
-                    return "-infinity"
-                elif obj != obj:  # NaN check
-                    return "NaN"
-            return obj
-        elif hasattr(obj, '__class__') and obj.__class__.__name__ == 'Decimal':
-            # Handle Decimal objects
+        # Walk the structure with an explicit stack; each item is filled into
+        # its already-allocated slot in the parent container
+        root = [None]
+        stack = [(obj, current_depth, root, 0)]
+        pop = stack.pop
+        while stack:
+            value, depth, parent, key = pop()
+            if depth > max_depth:
+                parent[key] = "[Max depth reached]"
+                continue
             try:
-                return float(obj)
+                parent[key] = _CLEAN_DISPATCH.get(type(value), _clean_other)(value, depth, stack)
             except:
-                return str(obj)
-        else:
-            # For other types, try to convert to string
-            try:
-                return str(obj)
-            except:
-                return "[Unserializable object]"
+                parent[key] = str(value)
+        return root[0]
     
     @staticmethod
     def export_flattened_json(results: Dict, filename: str) -> Dict:
@@ -333,18 +490,14 @@ class ResultsExporter:
                 "liquidation_statistics": results["liquidation_statistics"],
                 "price_statistics": results["price_statistics"],
                 "final_user_balances": results["final_user_balances"],
-                "trade_history": ResultsExporter._extract_trade_history(results),
-                "price_history": ResultsExporter._extract_price_history(results),
-                "funding_events": ResultsExporter._extract_funding_events(results),
-                "liquidation_events": ResultsExporter._extract_liquidation_events(results),
-                "user_position_history": ResultsExporter._extract_user_position_history(results)
+                **ResultsExporter._extract_all(results)
             }
             
-            with open(filename, 'w') as f:
-                json.dump(flattened_results, f, indent=2, default=str)
+            _write_json(flattened_results, filename, default=str)
             
             # Also save detailed logs separately
-            log_filename = filename.replace('.json', '_detailed_logs.json')
+            path = Path(filename)
+            log_filename = str(path.with_name(f"{path.stem}_detailed_logs.ndjson"))
             ResultsExporter._save_detailed_logs(results, log_filename)
             
             return {"success": True, "message": f"Flattened results exported to {filename}, detailed logs to {log_filename}"}
@@ -354,31 +507,33 @@ class ResultsExporter:
     
     @staticmethod
     def _save_detailed_logs(results: Dict, filename: str) -> None:
-        """Save detailed simulation logs separately."""
+        """Save detailed simulation logs separately.
+        
+        The file is newline-delimited JSON: a metadata line followed by one
+        simplified entry per line, streamed without building the whole log.
+        """
         try:
-            # Create a simplified version of the simulation log
-            simplified_logs = []
+            simulation_log = results.get("simulation_log", [])
+            metadata = {
+                "metadata": {
+                    "total_log_entries": len(simulation_log),
+                    "export_timestamp": datetime.now().isoformat(),
+                    "note": "Simplified simulation logs - complex nested data converted to summaries"
+                }
+            }
             
-            for log_entry in results.get("simulation_log", []):
-                simplified_entry = {
+            # Create a simplified version of the simulation log
+            simplified_logs = (
+                {
                     "timestamp": log_entry.get("timestamp", ""),
                     "hour": log_entry.get("hour", 0),
                     "event_type": log_entry.get("event_type", ""),
                     "data_summary": ResultsExporter._create_log_summary(log_entry.get("data", {}))
                 }
-                simplified_logs.append(simplified_entry)
-            
-            detailed_logs = {
-                "simulation_log": simplified_logs,
-                "metadata": {
-                    "total_log_entries": len(results.get("simulation_log", [])),
-                    "export_timestamp": datetime.now().isoformat(),
-                    "note": "Simplified simulation logs - complex nested data converted to summaries"
-                }
-            }
+                for log_entry in simulation_log
+            )
             
-            with open(filename, 'w') as f:
-                json.dump(detailed_logs, f, indent=2, default=str)
+            _write_ndjson(filename, itertools.chain((metadata,), simplified_logs), default=str)
                 
         except Exception as e:
             # If detailed logs fail, create a simple summary
@@ -394,8 +549,7 @@ class ResultsExporter:
                     }
                 }
                 
-                with open(filename, 'w') as f:
-                    json.dump(simple_logs, f, indent=2, default=str)
+                _write_ndjson(filename, (simple_logs,), default=str)
             except:
                 pass  # If even the summary fails, just skip it
     
@@ -406,11 +560,12 @@ class ResultsExporter:
         
         for key, value in data.items():
             if isinstance(value, dict):
-                # Create a simple summary of nested data
+                # Create a simple summary of nested data, stringifying it only once
+                text = str(value)
                 summary[key] = {
                     "type": "object",
                     "keys": list(value.keys()),
-                    "summary": str(value)[:100] + "..." if len(str(value)) > 100 else str(value)
+                    "summary": text[:100] + "..." if len(text) > 100 else text
                 }
             elif isinstance(value, list):
                 summary[key] = {
@@ -423,111 +578,44 @@ class ResultsExporter:
         
         return summary
     
+    @staticmethod
+    def _extract_all(results: Dict) -> Dict[str, List[Dict]]:
+        """Extract trade, price, funding, liquidation and position history in one pass over the simulation log."""
+        history = {key: [] for key in _HISTORY_KEYS}
+        get_handler = _EXTRACT_HANDLERS.get
+        
+        for log_entry in results.get("simulation_log", []):
+            # Hourly summaries are logged without an event_type
+            handler = get_handler(log_entry.get("event_type"))
+            if handler is not None:
+                handler(log_entry, history)
+        
+        return history
+    
     @staticmethod
     def _extract_trade_history(results: Dict) -> List[Dict]:
         """Extract trade history from simulation log."""
-        trades = []
-        for log_entry in results.get("simulation_log", []):
-            if log_entry.get("event_type") == "order_placed":
-                event_data = log_entry.get("data", {})
-                result_data = event_data.get("result", {})
-                if result_data.get("valid") and "trades" in result_data:
-                    for trade in result_data["trades"]:
-                        trades.append({
-                            "timestamp": log_entry.get("timestamp", ""),
-                            "hour": log_entry.get("hour", 0),
-                            "buyer": trade.get("buyer", ""),
-                            "seller": trade.get("seller", ""),
-                            "quantity": trade.get("quantity", 0),
-                            "price": trade.get("price", 0)
-                        })
-            elif log_entry.get("event_type") == "random_order":
-                # Also check random orders for trades
-                event_data = log_entry.get("data", {})
-                result_data = event_data.get("result", {})
-                if result_data.get("valid") and "trades" in result_data:
-                    for trade in result_data["trades"]:
-                        trades.append({
-                            "timestamp": log_entry.get("timestamp", ""),
-                            "hour": log_entry.get("hour", 0),
-                            "buyer": trade.get("buyer", ""),
-                            "seller": trade.get("seller", ""),
-                            "quantity": trade.get("quantity", 0),
-                            "price": trade.get("price", 0)
-                        })
-        return trades
+        return ResultsExporter._extract_all(results)["trade_history"]
     
     @staticmethod
     def _extract_price_history(results: Dict) -> List[Dict]:
         """Extract price history from simulation log."""
-        prices = []
-        for log_entry in results.get("simulation_log", []):
-            if log_entry.get("event_type") == "price_update":
-                data = log_entry.get("data", {})
-                prices.append({
-                    "timestamp": log_entry.get("timestamp", ""),
-                    "hour": log_entry.get("hour", 0),
-                    "price": data.get("new_price", 0)
-                })
-        return prices
+        return ResultsExporter._extract_all(results)["price_history"]
     
     @staticmethod
     def _extract_funding_events(results: Dict) -> List[Dict]:
         """Extract funding events from simulation log."""
-        funding_events = []
-        for log_entry in results.get("simulation_log", []):
-            if log_entry.get("event_type") == "funding_applied":
-                data = log_entry.get("data", {})
-                funding_events.append({
-                    "timestamp": log_entry.get("timestamp", ""),
-                    "hour": log_entry.get("hour", 0),
-                    "applied": data.get("applied", False),
-                    "funding_rate": data.get("funding_rate", 0),
-                    "total_funding_paid": data.get("total_funding_paid", 0)
-                })
-        return funding_events
+        return ResultsExporter._extract_all(results)["funding_events"]
     
     @staticmethod
     def _extract_liquidation_events(results: Dict) -> List[Dict]:
         """Extract liquidation events from simulation log."""
-        liquidations = []
-        for log_entry in results.get("simulation_log", []):
-            if log_entry.get("event_type") == "hourly_summary":
-                data = log_entry.get("data", {})
-                if data.get("liquidations", 0) > 0:
-                    liquidations.append({
-                        "timestamp": log_entry.get("timestamp", ""),
-                        "hour": log_entry.get("hour", 0),
-                        "liquidations_count": data.get("liquidations", 0)
-                    })
-        return liquidations
+        return ResultsExporter._extract_all(results)["liquidation_events"]
     
     @staticmethod
     def _extract_user_position_history(results: Dict) -> List[Dict]:
         """Extract user position history from simulation log."""
-        position_history = []
-        for log_entry in results.get("simulation_log", []):
-            if log_entry.get("event_type") == "hourly_summary":
-                data = log_entry.get("data", {})
-                user_summaries = data.get("user_summaries", {})
-                for user_id, summary in user_summaries.items():
-                    if summary and summary.get("has_position"):
-                        position_history.append({
-                            "timestamp": log_entry.get("timestamp", ""),
-                            "hour": log_entry.get("hour", 0),
-                            "user_id": user_id,
-                            "collateral": summary.get("collateral", 0),
-                            "realized_pnl": summary.get("realized_pnl", 0),
-                            "unrealized_pnl": summary.get("unrealized_pnl", 0),
-                            "total_equity": summary.get("total_equity", 0),
-                            "position_side": summary.get("position_side", ""),
-                            "position_quantity": summary.get("position_quantity", 0),
-                            "entry_price": summary.get("entry_price", 0),
-                            "leverage": summary.get("leverage", 1),
-                            "margin_ratio": summary.get("margin_ratio", 0),
-                            "is_liquidatable": summary.get("is_liquidatable", False)
-                        })
-        return position_history
+        return ResultsExporter._extract_all(results)["user_position_history"]
     
     @staticmethod
     def export_to_sqlite(results: Dict, filename: str) -> Dict:
@@ -538,20 +626,37 @@ class ResultsExporter:
                 os.remove(filename)
             
             conn = sqlite3.connect(filename)
-            cursor = conn.cursor()
-            
-            # Create tables
-            ResultsExporter._create_sqlite_tables(cursor)
-            
-            # Insert data
-            ResultsExporter._insert_simulation_data(cursor, results)
-            ResultsExporter._insert_trade_data(cursor, results)
-            ResultsExporter._insert_price_data(cursor, results)
-            ResultsExporter._insert_funding_data(cursor, results)
-            ResultsExporter._insert_user_data(cursor, results)
-            
-            conn.commit()
-            conn.close()
+            try:
+                # The export is rebuilt from scratch each run, so it needs no
+                # on-disk journal or fsyncs
+                conn.execute("PRAGMA journal_mode=MEMORY")
+                conn.execute("PRAGMA synchronous=OFF")
+                conn.execute("PRAGMA temp_store=MEMORY")
+                conn.execute("PRAGMA cache_size=-65536")
+                conn.execute("PRAGMA cache_spill=OFF")
+                
+                # One transaction for the whole export instead of one per statement
+                with conn:
+                    cursor = conn.cursor()
+                    # sqlite3 only opens transactions implicitly before DML, so
+                    # begin explicitly to cover the CREATE statements too
+                    cursor.execute("BEGIN")
+                    
+                    # Create tables
+                    ResultsExporter._create_sqlite_tables(cursor)
+                    
+                    # Insert data
+                    history = ResultsExporter._extract_all(results)
+                    ResultsExporter._insert_simulation_data(cursor, results)
+                    ResultsExporter._insert_trade_data(cursor, history["trade_history"])
+                    ResultsExporter._insert_price_data(cursor, history["price_history"])
+                    ResultsExporter._insert_funding_data(cursor, history["funding_events"])
+                    ResultsExporter._insert_user_data(cursor, history["user_position_history"])
+                    
+                    # Build indexes once over the loaded tables rather than per insert
+                    ResultsExporter._create_sqlite_indexes(cursor)
+            finally:
+                conn.close()
             
             return {"success": True, "message": f"SQLite database exported to {filename}"}
             
@@ -630,8 +735,10 @@ class ResultsExporter:
                 is_liquidatable BOOLEAN
             )
         ''')
-        
-        # Create indexes for better query performance
+    
+    @staticmethod
+    def _create_sqlite_indexes(cursor):
+        """Create indexes for better query performance."""
         cursor.execute('CREATE INDEX idx_trades_hour ON trades(hour)')
         cursor.execute('CREATE INDEX idx_trades_buyer ON trades(buyer)')
         cursor.execute('CREATE INDEX idx_trades_seller ON trades(seller)')
@@ -644,12 +751,7 @@ class ResultsExporter:
     def _insert_simulation_data(cursor, results):
         """Insert simulation summary data."""
         summary = results["simulation_summary"]
-        cursor.execute('''
-            INSERT INTO simulation_summary 
-            (total_hours, final_price, price_change_percent, total_trades, 
-             total_volume, total_funding_paid, total_liquidations)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        cursor.execute(_INSERT_SUMMARY_SQL, (
             summary["total_hours"],
             summary["final_price"],
             summary["price_change_percent"],
@@ -660,15 +762,10 @@ class ResultsExporter:
         ))
     
     @staticmethod
-    def _insert_trade_data(cursor, results):
+    def _insert_trade_data(cursor, trades: List[Dict]):
         """Insert trade data."""
-        trades = ResultsExporter._extract_trade_history(results)
-        for trade in trades:
-            cursor.execute('''
-                INSERT INTO trades 
-                (timestamp, hour, buyer, seller, quantity, price, trade_value)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
+        cursor.executemany(_INSERT_TRADE_SQL, [
+            (
                 trade["timestamp"],
                 trade["hour"],
                 trade["buyer"],
@@ -676,62 +773,53 @@ class ResultsExporter:
                 trade["quantity"],
                 trade["price"],
                 trade["quantity"] * trade["price"]
-            ))
+            )
+            for trade in trades
+        ])
     
     @staticmethod
-    def _insert_price_data(cursor, results):
+    def _insert_price_data(cursor, prices: List[Dict]):
         """Insert price history data."""
-        prices = ResultsExporter._extract_price_history(results)
-        for price in prices:
-            cursor.execute('''
-                INSERT INTO price_history (timestamp, hour, price)
-                VALUES (?, ?, ?)
-            ''', (price["timestamp"], price["hour"], price["price"]))
+        cursor.executemany(_INSERT_PRICE_SQL, [(price["timestamp"], price["hour"], price["price"]) for price in prices])
     
     @staticmethod
-    def _insert_funding_data(cursor, results):
+    def _insert_funding_data(cursor, funding_events: List[Dict]):
         """Insert funding events data."""
-        funding_events = ResultsExporter._extract_funding_events(results)
-        for event in funding_events:
-            cursor.execute('''
-                INSERT INTO funding_events 
-                (timestamp, hour, applied, funding_rate, total_funding_paid)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
+        cursor.executemany(_INSERT_FUNDING_SQL, [
+            (
                 event["timestamp"],
                 event["hour"],
                 event["applied"],
                 event["funding_rate"],
                 event["total_funding_paid"]
-            ))
+            )
+            for event in funding_events
+        ])
     
     @staticmethod
-    def _insert_user_data(cursor, results):
+    def _insert_user_data(cursor, positions: List[Dict]):
         """Insert user position data."""
-        positions = ResultsExporter._extract_user_position_history(results)
-        for pos in positions:
-            cursor.execute('''
-                INSERT INTO user_positions 
-                (timestamp, hour, user_id, collateral, realized_pnl, unrealized_pnl,
-                 total_equity, position_side, position_quantity, entry_price,
-                 leverage, margin_ratio, is_liquidatable)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+        cursor.executemany(_INSERT_POSITION_SQL, [
+            (
                 pos["timestamp"], pos["hour"], pos["user_id"], pos["collateral"],
                 pos["realized_pnl"], pos["unrealized_pnl"], pos["total_equity"],
                 pos["position_side"], pos["position_quantity"], pos["entry_price"],
                 pos["leverage"], pos["margin_ratio"], pos["is_liquidatable"]
-            ))
+            )
+            for pos in positions
+        ])
     
     @staticmethod
     def export_to_json(results: Dict, filename: str) -> Dict:
-        """Export results to JSON file using the cleaned approach."""
+        """Export results to JSON file, falling back to the cleaned approach."""
         try:
-            # Clean the results for JSON export
-            cleaned_results = ResultsExporter.clean_for_json(results)
-            
-            with open(filename, 'w') as f:
-                json.dump(cleaned_results, f, indent=2, default=str)
+            try:
+                # Most results serialize as-is; only structures the encoder
+                # rejects (such as circular references) pay for the cleaning pass
+                _write_json(results, filename, default=_json_default)
+            except (TypeError, ValueError, RecursionError):
+                cleaned_results = ResultsExporter.clean_for_json(results)
+                _write_json(cleaned_results, filename, default=str)
             
             return {"success": True, "message": f"Results exported to {filename}"}
             
@@ -748,57 +836,19 @@ class ResultsExporter:
             liquidation_stats = results["liquidation_statistics"]
             price_stats = results["price_statistics"]
             
-            report = f"""
-PERPETUAL FUTURES TRADING SIMULATION REPORT
-==========================================
-
-Simulation Summary:
-- Total Hours: {summary['total_hours']}
-- Final Price: ${summary['final_price']:,.2f}
-- Price Change: {summary['price_change_percent']:.2f}%
-- Total Trades: {summary['total_trades']}
-- Total Volume: ${summary['total_volume']:,.2f}
-- Total Funding Paid: ${summary['total_funding_paid']:,.2f}
-- Total Liquidations: {summary['total_liquidations']}
-
-Execution Statistics:
-- Average Trade Size: ${exec_stats['average_trade_size']:,.2f}
-- Filled Orders: {exec_stats['filled_orders']}
-- Partially Filled Orders: {exec_stats['partially_filled_orders']}
-
-Funding Statistics:
-- Total Funding Events: {funding_stats['total_funding_events']}
-- Average Funding Rate: {funding_stats['average_funding_rate']:.6f}
-- Max Funding Rate: {funding_stats['max_funding_rate']:.6f}
-- Min Funding Rate: {funding_stats['min_funding_rate']:.6f}
-
-Liquidation Statistics:
-- Total Liquidations: {liquidation_stats['total_liquidations']}
-- Total Liquidation Fees: ${liquidation_stats['total_liquidation_fees']:,.2f}
-- Total Collateral Lost: ${liquidation_stats['total_collateral_lost']:,.2f}
-- Average Liquidation Size: ${liquidation_stats['average_liquidation_size']:,.2f}
-
-Price Statistics:
-- Volatility: {price_stats.get('volatility', 0):.4f}
-- Min Price: ${price_stats.get('min_price', 0):,.2f}
-- Max Price: ${price_stats.get('max_price', 0):,.2f}
-- Data Points: {price_stats.get('data_points', 0)}
-
-Final User Balances:
-"""
-            
-            for user_id, balance in results["final_user_balances"].items():
-                report += f"""
-{user_id}:
-  Collateral: ${balance['collateral']:,.2f}
-  Realized PNL: ${balance['realized_pnl']:,.2f}
-  Unrealized PNL: ${balance['unrealized_pnl']:,.2f}
-  Total Equity: ${balance['total_equity']:,.2f}
-  Has Position: {balance['has_position']}
-"""
+            header = _REPORT_TEMPLATE.format(
+                summary=summary,
+                exec_stats=exec_stats,
+                funding_stats=funding_stats,
+                liquidation_stats=liquidation_stats,
+                price_stats={**_REPORT_PRICE_DEFAULTS, **price_stats}
+            )
             
+            # Stream user blocks to the file rather than holding the whole report in memory
             with open(filename, 'w') as f:
-                f.write(report)
+                f.write(header)
+                for user_id, balance in results["final_user_balances"].items():
+                    f.write(_REPORT_USER_TEMPLATE.format(user_id=user_id, balance=balance))
             
             return {"success": True, "message": f"Summary report exported to {filename}"}
             
@@ -809,27 +859,14 @@ Final User Balances:
     def export_trade_history(results: Dict, filename: str) -> Dict:
         """Export trade history to CSV file."""
         try:
-            import csv
-            
-            # Extract trade history from simulation log
-            trades = []
-            for log_entry in results["simulation_log"]:
-                if log_entry["event_type"] == "order_placed" and log_entry["data"]["result"]["valid"]:
-                    for trade in log_entry["data"]["result"]["trades"]:
-                        trades.append({
-                            "timestamp": log_entry["timestamp"],
-                            "hour": log_entry["hour"],
-                            "buyer": trade["buyer"],
-                            "seller": trade["seller"],
-                            "quantity": trade["quantity"],
-                            "price": trade["price"]
-                        })
+            # The simulator records trade rows in export order as they happen
+            trade_log = results.get("trade_log", [])
             
             with open(filename, 'w', newline='') as f:
-                if trades:
-                    writer = csv.DictWriter(f, fieldnames=trades[0].keys())
-                    writer.writeheader()
-                    writer.writerows(trades)
+                if trade_log:
+                    writer = csv.writer(f)
+                    writer.writerow(_TRADE_HISTORY_FIELDS)
+                    writer.writerows(trade_log)
             
             return {"success": True, "message": f"Trade history exported to {filename}"}
             
@@ -845,7 +882,7 @@ def main():
     parser.add_argument("--output", "-o", help="Output file path")
     parser.add_argument("--format", choices=["json", "flattened", "sqlite"], 
                        default="flattened", help="Export format (default: flattened)")
-    parser.add_argument("--scenario", "-s", choices=["sample", "crash", "pump"], 
+    parser.add_argument("--scenario", "-s", choices=list(_SCENARIO_CONFIGS), 
                        help="Generate sample scenario")
     parser.add_argument("--generate-config", "-g", help="Generate config file")
     
@@ -853,14 +890,7 @@ def main():
     
     # Generate configuration if requested
     if args.generate_config:
-        if args.scenario == "sample":
-            config = ConfigManager.create_sample_config()
-        elif args.scenario == "crash":
-            config = ConfigManager.create_crash_scenario_config()
-        elif args.scenario == "pump":
-            config = ConfigManager.create_pump_scenario_config()
-        else:
-            config = ConfigManager.create_sample_config()
+        config = _SCENARIO_CONFIGS.get(args.scenario, ConfigManager.create_sample_config)()
         
         result = ConfigManager.save_config(config, args.generate_config)
         print(result["message"])
@@ -957,8 +987,7 @@ def main():
                     "final_user_balances": results["final_user_balances"]
                 }
                 fallback_file = args.output.replace('.json', '_summary.json').replace('.db', '_summary.json')
-                with open(fallback_file, 'w') as f:
-                    json.dump(summary_only, f, indent=2, default=str)
+                _write_json(summary_only, fallback_file, default=str)
                 print(f"Summary saved to: {fallback_file}")
             except Exception as e2:
                 print(f"Could not save summary either: {e2}")
@@ -6,7 +6,24 @@ from decimal import Decimal
 from datetime import datetime, timedelta
 
 from src.models.data_models import MarketData, User, Position
-from src.engine.position_manager import PositionManager
+from src.engine.position_manager import DEFAULT_SYMBOL, POSITION_SIDE_SIGN, PositionManager
+
+
+# Funding rate dampening factor (1/8) and cap (-1% to +1%)
+FUNDING_RATE_FACTOR = 0.125
+FUNDING_RATE_CAP = 0.01
+
+
+def _funding_rate(mark_price: float, index_price: float) -> float:
+    """Funding rate for the given prices, computed in floats since it is capped to ±1%."""
+    if index_price == 0.0:
+        return 0.0
+    
+    # funding_rate = (mark_price - index_price) / index_price * (1/8)
+    funding_rate = (mark_price - index_price) / index_price * FUNDING_RATE_FACTOR
+    
+    # Cap funding rate to reasonable bounds (-1% to +1%)
+    return max(-FUNDING_RATE_CAP, min(FUNDING_RATE_CAP, funding_rate))
 
 
 class FundingRateManager:
@@ -17,21 +34,20 @@ class FundingRateManager:
         self.funding_history: List[Dict] = []
         self.last_funding_time: Optional[datetime] = None
         self.funding_interval_hours = 8  # Funding every 8 hours
+        self._reset_funding_statistics()
+    
+    def _reset_funding_statistics(self) -> None:
+        """Reset the running aggregates behind get_funding_statistics."""
+        self._total_funding_paid = 0.0
+        self._funding_rate_sum = 0.0
+        self._max_funding_rate = 0.0
+        self._min_funding_rate = 0.0
+        self._user_funding_totals: Dict[str, float] = {}
     
     def calculate_funding_rate(self, market_data: MarketData) -> Decimal:
         """Calculate funding rate based on mark and index prices."""
-        if market_data.index_price == Decimal('0'):
-            return Decimal('0')
-        
-        # funding_rate = (mark_price - index_price) / index_price * (1/8)
-        price_diff = market_data.mark_price - market_data.index_price
-        funding_rate = (price_diff / market_data.index_price) * Decimal('0.125')  # 1/8
-        
-        # Cap funding rate to reasonable bounds (-1% to +1%)
-        funding_rate = max(funding_rate, Decimal('-0.01'))
-        funding_rate = min(funding_rate, Decimal('0.01'))
-        
-        return funding_rate
+        funding_rate = _funding_rate(float(market_data.mark_price), float(market_data.index_price))
+        return Decimal(repr(funding_rate))
     
     def should_apply_funding(self, current_time: datetime) -> bool:
         """Check if it's time to apply funding."""
@@ -55,25 +71,38 @@ class FundingRateManager:
         
         # Apply funding to positions
         funding_payments = self.position_manager.apply_funding()
+        rate = float(funding_rate)
+        total_funding_paid = float(sum(funding_payments.values()))
         
         # Record funding event
         funding_record = {
             "timestamp": current_time.isoformat(),
-            "funding_rate": float(funding_rate),
+            "funding_rate": rate,
             "mark_price": float(market_data.mark_price),
             "index_price": float(market_data.index_price),
             "funding_payments": {user_id: float(payment) for user_id, payment in funding_payments.items()},
-            "total_funding_paid": float(sum(funding_payments.values()))
+            "total_funding_paid": total_funding_paid
         }
         
         self.funding_history.append(funding_record)
         self.last_funding_time = current_time
         
+        # Keep statistics up to date instead of rescanning the history
+        if len(self.funding_history) == 1:
+            self._max_funding_rate = self._min_funding_rate = rate
+        else:
+            self._max_funding_rate = max(self._max_funding_rate, rate)
+            self._min_funding_rate = min(self._min_funding_rate, rate)
+        self._funding_rate_sum += rate
+        self._total_funding_paid += total_funding_paid
+        for user_id, payment in funding_record["funding_payments"].items():
+            self._user_funding_totals[user_id] = self._user_funding_totals.get(user_id, 0.0) + payment
+        
         return {
             "applied": True,
-            "funding_rate": float(funding_rate),
+            "funding_rate": rate,
             "funding_payments": funding_payments,
-            "total_funding_paid": float(sum(funding_payments.values())),
+            "total_funding_paid": total_funding_paid,
             "message": f"Funding applied successfully. Rate: {funding_rate:.6f}"
         }
     
@@ -97,53 +126,40 @@ class FundingRateManager:
             }
         
         total_events = len(self.funding_history)
-        total_paid = sum(record["total_funding_paid"] for record in self.funding_history)
-        
-        funding_rates = [record["funding_rate"] for record in self.funding_history]
-        avg_rate = sum(funding_rates) / len(funding_rates)
-        max_rate = max(funding_rates)
-        min_rate = min(funding_rates)
         
         return {
             "total_funding_events": total_events,
-            "total_funding_paid": total_paid,
-            "average_funding_rate": avg_rate,
-            "max_funding_rate": max_rate,
-            "min_funding_rate": min_rate
+            "total_funding_paid": self._total_funding_paid,
+            "average_funding_rate": self._funding_rate_sum / total_events,
+            "max_funding_rate": self._max_funding_rate,
+            "min_funding_rate": self._min_funding_rate
         }
     
     def simulate_funding_scenarios(self, market_data: MarketData) -> Dict:
         """Simulate different funding scenarios."""
         scenarios = {}
+        mark_price = float(market_data.mark_price)
         
         # Scenario 1: Mark price above index (positive funding)
+        index_price = mark_price * 0.99  # 1% below mark
         scenarios["positive_funding"] = {
-            "mark_price": float(market_data.mark_price),
-            "index_price": float(market_data.mark_price * Decimal('0.99')),  # 1% below mark
-            "funding_rate": float(self.calculate_funding_rate(
-                MarketData(
-                    mark_price=market_data.mark_price,
-                    index_price=market_data.mark_price * Decimal('0.99')
-                )
-            ))
+            "mark_price": mark_price,
+            "index_price": index_price,
+            "funding_rate": _funding_rate(mark_price, index_price)
         }
         
         # Scenario 2: Mark price below index (negative funding)
+        index_price = mark_price * 1.01  # 1% above mark
         scenarios["negative_funding"] = {
-            "mark_price": float(market_data.mark_price),
-            "index_price": float(market_data.mark_price * Decimal('1.01')),  # 1% above mark
-            "funding_rate": float(self.calculate_funding_rate(
-                MarketData(
-                    mark_price=market_data.mark_price,
-                    index_price=market_data.mark_price * Decimal('1.01')
-                )
-            ))
+            "mark_price": mark_price,
+            "index_price": index_price,
+            "funding_rate": _funding_rate(mark_price, index_price)
         }
         
         # Scenario 3: Mark price equals index (zero funding)
         scenarios["zero_funding"] = {
-            "mark_price": float(market_data.mark_price),
-            "index_price": float(market_data.mark_price),
+            "mark_price": mark_price,
+            "index_price": mark_price,
             "funding_rate": 0.0
         }
         
@@ -157,12 +173,8 @@ class FundingRateManager:
         """Calculate funding impact for a specific position."""
         position_value = position.quantity * position.entry_price
         
-        if position.side.value == "long":
-            # Long positions pay funding when rate is positive
-            funding_payment = position_value * funding_rate
-        else:
-            # Short positions pay funding when rate is negative
-            funding_payment = position_value * (-funding_rate)
+        # Longs pay funding when the rate is positive, shorts when it is negative
+        funding_payment = POSITION_SIDE_SIGN[position.side] * position_value * funding_rate
         
         return {
             "position_value": float(position_value),
@@ -178,7 +190,7 @@ class FundingRateManager:
         if not user:
             return {"error": "User not found"}
         
-        position = user.get_position("BTC/USD")
+        position = user.get_position(DEFAULT_SYMBOL)
         if not position:
             return {
                 "user_id": user_id,
@@ -186,23 +198,21 @@ class FundingRateManager:
                 "total_funding_paid": float(position.funding_paid) if position else 0.0
             }
         
-        # Calculate total funding paid from history
-        total_funding_paid = Decimal('0')
-        for record in self.funding_history:
-            if user_id in record["funding_payments"]:
-                total_funding_paid += Decimal(str(record["funding_payments"][user_id]))
+        # Total funding paid across the history, kept up to date by apply_funding
+        total_funding_paid = self._user_funding_totals.get(user_id, 0.0)
         
         return {
             "user_id": user_id,
             "has_position": True,
             "position_side": position.side.value,
             "position_value": float(position.position_value),
-            "total_funding_paid": float(total_funding_paid),
+            "total_funding_paid": total_funding_paid,
             "funding_paid_from_position": float(position.funding_paid),
-            "funding_impact_percentage": float(total_funding_paid / user.collateral * 100) if user.collateral > 0 else 0
+            "funding_impact_percentage": total_funding_paid / float(user.collateral) * 100 if user.collateral > 0 else 0
         }
     
     def reset_funding_history(self) -> None:
         """Reset funding history."""
         self.funding_history = []
         self.last_funding_time = None
+        self._reset_funding_statistics()
@@ -6,7 +6,97 @@ from decimal import Decimal
 from datetime import datetime
 
 from src.models.data_models import Position, User, MarketData
-from src.engine.position_manager import PositionManager
+from src.engine.position_manager import DEFAULT_SYMBOL, POSITION_SIDE_SIGN, PositionManager
+
+
+# Maintenance margin as a fraction of position value
+MAINTENANCE_MARGIN_RATE = 0.05
+
+# Decimal constants for the Decimal code paths, parsed once at import
+MAINTENANCE_MARGIN_RATE_DECIMAL = Decimal('0.05')
+DECIMAL_ZERO = Decimal('0')
+DECIMAL_INF = Decimal('inf')
+
+# Risk levels as (margin ratio upper bound, level), checked in order
+RISK_LEVEL_THRESHOLDS = (
+    (1.1, "critical"),
+    (1.5, "high"),
+    (2.0, "medium")
+)
+
+# Liquidation scenarios as (name, mark price multiplier)
+LIQUIDATION_SCENARIOS = (
+    ("current", 1.0),
+    ("price_drop_10", 0.9),
+    ("price_drop_20", 0.8),
+    ("price_drop_30", 0.7)
+)
+
+
+def _position_floats(position: Position) -> Tuple[float, float, float, int]:
+    """Entry price, quantity and collateral of a position as floats, plus its side sign.
+    
+    Decimal to float conversion goes through a string, so callers convert a
+    position once and reuse the values across every price they evaluate.
+    """
+    return (
+        float(position.entry_price),
+        float(position.quantity),
+        float(position.collateral),
+        POSITION_SIDE_SIGN[position.side]
+    )
+
+
+def _risk_kernel(
+    entry_price: float, 
+    quantity: float, 
+    collateral: float, 
+    side_sign: int, 
+    mark_price: float
+) -> Tuple[float, float, float, float, float]:
+    """Unrealized PNL, equity, maintenance margin, margin ratio and liquidation price of a position.
+    
+    side_sign is 1 for long positions and -1 for short positions.
+    """
+    unrealized_pnl = side_sign * (mark_price - entry_price) * quantity
+    equity = collateral + unrealized_pnl
+    maintenance_margin = quantity * mark_price * MAINTENANCE_MARGIN_RATE
+    margin_ratio = equity / maintenance_margin if maintenance_margin > 0 else float('inf')
+    
+    # Solve collateral + side_sign * (lp - ep) * q = lp * q * 0.05 for lp
+    denominator = quantity * MAINTENANCE_MARGIN_RATE - side_sign * quantity
+    if denominator != 0:
+        liquidation_price = (collateral - side_sign * entry_price * quantity) / denominator
+    else:
+        liquidation_price = 0.0 if side_sign > 0 else float('inf')
+    
+    return unrealized_pnl, equity, maintenance_margin, margin_ratio, liquidation_price
+
+
+def _liquidation_risk(
+    entry_price: float, 
+    quantity: float, 
+    collateral: float, 
+    side_sign: int, 
+    mark_price: float
+) -> Dict:
+    """Float liquidation risk analysis of a position at the given mark price."""
+    unrealized_pnl, equity, maintenance_margin, margin_ratio, liquidation_price = _risk_kernel(
+        entry_price, quantity, collateral, side_sign, mark_price
+    )
+    
+    price_distance = abs(mark_price - liquidation_price)
+    return {
+        "mark_price": mark_price,
+        "unrealized_pnl": unrealized_pnl,
+        "equity": equity,
+        "maintenance_margin": maintenance_margin,
+        "margin_ratio": margin_ratio,
+        "is_liquidatable": equity < maintenance_margin,
+        "liquidation_price": liquidation_price,
+        "price_distance_to_liquidation": price_distance,
+        "liquidation_distance_percent": price_distance / mark_price * 100
+    }
 
 
 class LiquidationEngine:
@@ -17,20 +107,45 @@ class LiquidationEngine:
         self.liquidation_history: List[Dict] = []
         self.liquidation_fee_rate = Decimal('0.01')  # 1% liquidation fee
         self.liquidation_threshold = Decimal('1.0')  # Liquidation when equity < maintenance margin
+        self._reset_liquidation_statistics()
     
-    def check_liquidations(self, market_data: MarketData) -> List[Dict]:
-        """Check for positions that need to be liquidated."""
+    def _reset_liquidation_statistics(self) -> None:
+        """Reset the running totals behind get_liquidation_statistics."""
+        self._total_liquidation_fees = 0.0
+        self._total_collateral_lost = 0.0
+        self._total_liquidated_value = 0.0
+    
+    def check_liquidations(
+        self, 
+        market_data: MarketData, 
+        current_time: Optional[datetime] = None
+    ) -> List[Dict]:
+        """Check for positions that need to be liquidated.
+        
+        Liquidations are stamped with current_time (the simulation clock),
+        or the wall clock when it is not given.
+        """
         liquidatable_positions = self.position_manager.get_liquidatable_positions()
         liquidations = []
+        if not liquidatable_positions:
+            return liquidations
+        
+        # Format the timestamp once for every liquidation in this check
+        timestamp = (current_time or datetime.now()).isoformat()
         
         for position in liquidatable_positions:
-            liquidation_result = self.liquidate_position(position, market_data)
+            liquidation_result = self.liquidate_position(position, market_data, timestamp)
             liquidations.append(liquidation_result)
         
         return liquidations
     
-    def liquidate_position(self, position: Position, market_data: MarketData) -> Dict:
-        """Liquidate a specific position."""
+    def liquidate_position(
+        self, 
+        position: Position, 
+        market_data: MarketData, 
+        timestamp: Optional[str] = None
+    ) -> Dict:
+        """Liquidate a specific position, recording it at the given ISO timestamp."""
         user = self.position_manager.get_user(position.user_id)
         if not user:
             return {
@@ -44,10 +159,8 @@ class LiquidationEngine:
         position_value = position.quantity * liquidation_price
         
         # Calculate PNL
-        if position.side.value == "long":
-            realized_pnl = (liquidation_price - position.entry_price) * position.quantity
-        else:
-            realized_pnl = (position.entry_price - liquidation_price) * position.quantity
+        side_sign = POSITION_SIDE_SIGN[position.side]
+        realized_pnl = side_sign * (liquidation_price - position.entry_price) * position.quantity
         
         # Calculate liquidation fee
         liquidation_fee = position_value * self.liquidation_fee_rate
@@ -57,7 +170,7 @@ class LiquidationEngine:
         
         # Record liquidation
         liquidation_record = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp or datetime.now().isoformat(),
             "user_id": position.user_id,
             "position_side": position.side.value,
             "position_quantity": float(position.quantity),
@@ -67,7 +180,7 @@ class LiquidationEngine:
             "realized_pnl": float(realized_pnl),
             "liquidation_fee": float(liquidation_fee),
             "initial_collateral": float(position.collateral),
-            "final_collateral": float(max(Decimal('0'), final_collateral)),
+            "final_collateral": float(max(DECIMAL_ZERO, final_collateral)),
             "margin_ratio_before": float(position.margin_ratio),
             "leverage": position.leverage
         }
@@ -78,8 +191,13 @@ class LiquidationEngine:
         # Update liquidation record with actual fee paid
         liquidation_record["actual_liquidation_fee"] = float(liquidation_fee_paid)
         
-        # Add to history
+        # Add to history, keeping statistics up to date instead of rescanning it
         self.liquidation_history.append(liquidation_record)
+        self._total_liquidation_fees += liquidation_record["actual_liquidation_fee"]
+        self._total_collateral_lost += (
+            liquidation_record["initial_collateral"] - liquidation_record["final_collateral"]
+        )
+        self._total_liquidated_value += liquidation_record["position_value"]
         
         return {
             "success": True,
@@ -90,27 +208,18 @@ class LiquidationEngine:
     def simulate_liquidation_scenarios(self, market_data: MarketData) -> Dict:
         """Simulate different liquidation scenarios."""
         scenarios = {}
+        mark_price = float(market_data.mark_price)
         
         for user_id, user in self.position_manager.users.items():
-            position = user.get_position("BTC/USD")
+            position = user.get_position(DEFAULT_SYMBOL)
             if not position:
                 continue
             
-            # Current scenario
+            # Convert the position once and evaluate every price shock in floats
+            position_floats = _position_floats(position)
             scenarios[user_id] = {
-                "current": self._analyze_position_liquidation_risk(position, market_data),
-                "price_drop_10": self._analyze_position_liquidation_risk(
-                    position, 
-                    MarketData(mark_price=market_data.mark_price * Decimal('0.9'))
-                ),
-                "price_drop_20": self._analyze_position_liquidation_risk(
-                    position, 
-                    MarketData(mark_price=market_data.mark_price * Decimal('0.8'))
-                ),
-                "price_drop_30": self._analyze_position_liquidation_risk(
-                    position, 
-                    MarketData(mark_price=market_data.mark_price * Decimal('0.7'))
-                )
+                scenario: _liquidation_risk(*position_floats, mark_price * price_factor)
+                for scenario, price_factor in LIQUIDATION_SCENARIOS
             }
         
         return scenarios
@@ -121,38 +230,7 @@ class LiquidationEngine:
         market_data: MarketData
     ) -> Dict:
         """Analyze liquidation risk for a position at given market data."""
-        # Update PNL with current market data
-        if position.side.value == "long":
-            unrealized_pnl = (market_data.mark_price - position.entry_price) * position.quantity
-        else:
-            unrealized_pnl = (position.entry_price - market_data.mark_price) * position.quantity
-        
-        # Calculate equity
-        equity = position.collateral + unrealized_pnl
-        
-        # Calculate maintenance margin
-        position_value = position.quantity * market_data.mark_price
-        maintenance_margin = position_value * Decimal('0.05')
-        
-        # Calculate margin ratio
-        margin_ratio = equity / maintenance_margin if maintenance_margin > 0 else Decimal('inf')
-        
-        # Calculate liquidation price
-        liquidation_price = self._calculate_liquidation_price(position, market_data)
-        
-        return {
-            "mark_price": float(market_data.mark_price),
-            "unrealized_pnl": float(unrealized_pnl),
-            "equity": float(equity),
-            "maintenance_margin": float(maintenance_margin),
-            "margin_ratio": float(margin_ratio),
-            "is_liquidatable": equity < maintenance_margin,
-            "liquidation_price": float(liquidation_price),
-            "price_distance_to_liquidation": float(abs(market_data.mark_price - liquidation_price)),
-            "liquidation_distance_percent": float(
-                abs(market_data.mark_price - liquidation_price) / market_data.mark_price * 100
-            )
-        }
+        return _liquidation_risk(*_position_floats(position), float(market_data.mark_price))
     
     def _calculate_liquidation_price(self, position: Position, market_data: MarketData) -> Decimal:
         """Calculate the liquidation price for a position."""
@@ -161,23 +239,14 @@ class LiquidationEngine:
         # maintenance_margin = liquidation_price * quantity * 0.05
         # Solving: collateral + (lp - ep) * q = lp * q * 0.05
         # lp = (collateral - ep * q) / (q * 0.05 - q)
-        
-        if position.side.value == "long":
-            # Long liquidation price
-            numerator = position.collateral - position.entry_price * position.quantity
-            denominator = position.quantity * Decimal('0.05') - position.quantity
-            if denominator != Decimal('0'):
-                liquidation_price = numerator / denominator
-            else:
-                liquidation_price = Decimal('0')
+        # Shorts mirror this with the side sign: lp = (collateral + ep * q) / (q * 0.05 + q)
+        side_sign = POSITION_SIDE_SIGN[position.side]
+        numerator = position.collateral - side_sign * position.entry_price * position.quantity
+        denominator = position.quantity * MAINTENANCE_MARGIN_RATE_DECIMAL - side_sign * position.quantity
+        if denominator != DECIMAL_ZERO:
+            liquidation_price = numerator / denominator
         else:
-            # Short liquidation price
-            numerator = position.collateral + position.entry_price * position.quantity
-            denominator = position.quantity * Decimal('0.05') + position.quantity
-            if denominator != Decimal('0'):
-                liquidation_price = numerator / denominator
-            else:
-                liquidation_price = Decimal('inf')
+            liquidation_price = DECIMAL_ZERO if side_sign > 0 else DECIMAL_INF
         
         return liquidation_price
     
@@ -196,19 +265,12 @@ class LiquidationEngine:
             }
         
         total_liquidations = len(self.liquidation_history)
-        total_fees = sum(record["actual_liquidation_fee"] for record in self.liquidation_history)
-        total_collateral_lost = sum(
-            record["initial_collateral"] - record["final_collateral"] 
-            for record in self.liquidation_history
-        )
-        
-        avg_size = sum(record["position_value"] for record in self.liquidation_history) / total_liquidations
         
         return {
             "total_liquidations": total_liquidations,
-            "total_liquidation_fees": float(total_fees),
-            "total_collateral_lost": float(total_collateral_lost),
-            "average_liquidation_size": float(avg_size)
+            "total_liquidation_fees": float(self._total_liquidation_fees),
+            "total_collateral_lost": float(self._total_collateral_lost),
+            "average_liquidation_size": float(self._total_liquidated_value / total_liquidations)
         }
     
     def get_user_liquidation_risk(self, user_id: str, market_data: MarketData) -> Optional[Dict]:
@@ -217,7 +279,11 @@ class LiquidationEngine:
         if not user:
             return None
         
-        position = user.get_position("BTC/USD")
+        return self._user_liquidation_risk(user_id, user, float(market_data.mark_price))
+    
+    def _user_liquidation_risk(self, user_id: str, user: User, mark_price: float) -> Dict:
+        """Liquidation risk analysis for a user at a float mark price."""
+        position = user.get_position(DEFAULT_SYMBOL)
         if not position:
             return {
                 "user_id": user_id,
@@ -225,18 +291,15 @@ class LiquidationEngine:
                 "risk_level": "none"
             }
         
-        risk_analysis = self._analyze_position_liquidation_risk(position, market_data)
+        risk_analysis = _liquidation_risk(*_position_floats(position), mark_price)
         
         # Determine risk level
         margin_ratio = risk_analysis["margin_ratio"]
-        if margin_ratio < Decimal('1.1'):
-            risk_level = "critical"
-        elif margin_ratio < Decimal('1.5'):
-            risk_level = "high"
-        elif margin_ratio < Decimal('2.0'):
-            risk_level = "medium"
-        else:
-            risk_level = "low"
+        risk_level = "low"
+        for threshold, level in RISK_LEVEL_THRESHOLDS:
+            if margin_ratio < threshold:
+                risk_level = level
+                break
         
         risk_analysis["risk_level"] = risk_level
         risk_analysis["user_id"] = user_id
@@ -246,14 +309,12 @@ class LiquidationEngine:
     
     def get_all_liquidation_risks(self, market_data: MarketData) -> Dict[str, Dict]:
         """Get liquidation risk analysis for all users."""
-        risks = {}
-        
-        for user_id in self.position_manager.users.keys():
-            risk = self.get_user_liquidation_risk(user_id, market_data)
-            if risk:
-                risks[user_id] = risk
-        
-        return risks
+        # Convert the mark price once and skip the per-user lookup by id
+        mark_price = float(market_data.mark_price)
+        return {
+            user_id: self._user_liquidation_risk(user_id, user, mark_price)
+            for user_id, user in self.position_manager.users.items()
+        }
     
     def calculate_optimal_position_size(
         self, 
@@ -272,7 +333,7 @@ class LiquidationEngine:
         # So: collateral / (position_value * 0.05) >= risk_tolerance
         # position_value <= collateral / (0.05 * risk_tolerance)
         
-        max_position_value = user_collateral / (Decimal('0.05') * risk_tolerance)
+        max_position_value = user_collateral / (MAINTENANCE_MARGIN_RATE_DECIMAL * risk_tolerance)
         max_quantity = max_position_value / entry_price
         
         return max_quantity
@@ -280,3 +341,4 @@ class LiquidationEngine:
     def reset_liquidation_history(self) -> None:
         """Reset liquidation history."""
         self.liquidation_history = []
+        self._reset_liquidation_statistics()
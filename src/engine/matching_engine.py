@@ -4,10 +4,24 @@ Order placement and matching engine with partial fills support.
 from typing import List, Optional, Dict
 from decimal import Decimal
 from datetime import datetime
+from collections import defaultdict, deque
+from itertools import islice
 
 from src.models.data_models import Order, OrderSide, OrderType, User
 from src.engine.order_book import OrderBook
-from src.engine.position_manager import PositionManager
+from src.engine.position_manager import LEVERAGE_DECIMALS, PositionManager
+
+
+# Most recent trade records kept in memory
+MAX_TRADE_HISTORY = 1_000_000
+
+# Order validation constants, built once rather than per order
+_ZERO = Decimal('0')
+_VALID_SIDES = (OrderSide.BUY, OrderSide.SELL)
+_VALID_ORDER_TYPES = (OrderType.LIMIT, OrderType.MARKET)
+
+# Shared result for passing checks; callers only read it
+_VALID = {"valid": True}
 
 
 class OrderMatchingEngine:
@@ -17,8 +31,17 @@ class OrderMatchingEngine:
         self.order_book = OrderBook()
         self.position_manager = position_manager
         self.logger = logger  # Add logger reference
-        self.trade_history: List[Dict] = []
+        self.trade_history: deque = deque(maxlen=MAX_TRADE_HISTORY)
         self.order_history: List[Order] = []
+        self._orders_by_user: Dict[str, List[Order]] = defaultdict(list)
+        self._order_log_cache: Dict[str, Dict] = {}
+        self._order_status_cache: Dict[str, tuple] = {}
+        
+        # Running execution statistics, updated as trades and status changes happen
+        self._total_trades = 0
+        self._total_notional = 0.0
+        self._order_statuses: Dict[str, str] = {}
+        self._status_counts: Dict[str, int] = defaultdict(int)
     
     def place_order(self, order: Order, current_hour: int = 0) -> Dict:
         """Place an order and return execution results."""
@@ -34,6 +57,7 @@ class OrderMatchingEngine:
         
         # Add order to history
         self.order_history.append(order)
+        self._orders_by_user[order.user_id].append(order)
         
         # Place order in order book and get trades
         trades = self.order_book.add_order(order)
@@ -46,6 +70,7 @@ class OrderMatchingEngine:
             order.status = "filled"
         elif order.is_partially_filled:
             order.status = "partially_filled"
+        self._track_status(order)
         
         return {
             "valid": True,
@@ -57,37 +82,37 @@ class OrderMatchingEngine:
     
     def _validate_order(self, order: Order) -> Dict:
         """Validate an order before placement."""
-        if order.quantity <= Decimal('0'):
+        if order.quantity <= _ZERO:
             return {
                 "valid": False,
                 "message": "Order quantity must be greater than 0"
             }
         
-        if order.price <= Decimal('0'):
+        if order.price <= _ZERO:
             return {
                 "valid": False,
                 "message": "Order price must be greater than 0"
             }
         
-        if order.leverage < 1 or order.leverage > 10:
+        if not 1 <= order.leverage <= 10:
             return {
                 "valid": False,
                 "message": "Leverage must be between 1 and 10"
             }
         
-        if order.side not in [OrderSide.BUY, OrderSide.SELL]:
+        if order.side not in _VALID_SIDES:
             return {
                 "valid": False,
                 "message": "Invalid order side"
             }
         
-        if order.order_type not in [OrderType.LIMIT, OrderType.MARKET]:
+        if order.order_type not in _VALID_ORDER_TYPES:
             return {
                 "valid": False,
                 "message": "Invalid order type"
             }
         
-        return {"valid": True}
+        return _VALID
     
     def _check_margin_requirements(self, order: Order) -> Dict:
         """Check if user has sufficient margin for the order."""
@@ -100,7 +125,10 @@ class OrderMatchingEngine:
         
         # Calculate required margin
         position_value = order.quantity * order.price
-        required_margin = position_value / Decimal(str(order.leverage))
+        leverage = LEVERAGE_DECIMALS.get(order.leverage)
+        if leverage is None:
+            leverage = Decimal(str(order.leverage))
+        required_margin = position_value / leverage
         
         # Check if user has sufficient collateral
         if user.collateral < required_margin:
@@ -140,35 +168,52 @@ class OrderMatchingEngine:
             
             processed_trades.append(trade_record)
             self.trade_history.append(trade_record)
+            self._total_trades += 1
+            self._total_notional += trade_record["quantity"] * trade_record["price"]
+            self._track_status(buy_order)
+            self._track_status(sell_order)
             
             # Log trade execution if logger is available
             if self.logger:
-                # Convert orders to dict format for logging
-                buy_order_dict = {
-                    "user_id": buy_order.user_id,
-                    "side": buy_order.side.value,
-                    "quantity": float(buy_order.quantity),
-                    "price": float(buy_order.price),
-                    "leverage": buy_order.leverage
-                }
-                sell_order_dict = {
-                    "user_id": sell_order.user_id,
-                    "side": sell_order.side.value,
-                    "quantity": float(sell_order.quantity),
-                    "price": float(sell_order.price),
-                    "leverage": sell_order.leverage
-                }
                 trade_dict = {
-                    "trade_id": trade.id,
-                    "quantity": float(trade.quantity),
-                    "price": float(trade.price),
-                    "timestamp": trade.timestamp.isoformat()
+                    "trade_id": trade_record["trade_id"],
+                    "quantity": trade_record["quantity"],
+                    "price": trade_record["price"],
+                    "timestamp": trade_record["timestamp"]
                 }
                 
-                self.logger.log_trade_execution(current_hour, trade_dict, buy_order_dict, sell_order_dict)
+                self.logger.log_trade_execution(
+                    current_hour,
+                    trade_dict,
+                    self._order_log_dict(buy_order),
+                    self._order_log_dict(sell_order)
+                )
         
         return {"trades": processed_trades}
     
+    def _order_log_dict(self, order: Order) -> Dict:
+        """Get an order in dict format for trade logging, built once per order."""
+        order_dict = self._order_log_cache.get(order.id)
+        if order_dict is None:
+            # Only fields fixed at placement are logged, so later fills can reuse this
+            order_dict = self._order_log_cache[order.id] = {
+                "user_id": order.user_id,
+                "side": order.side.value,
+                "quantity": float(order.quantity),
+                "price": float(order.price),
+                "leverage": order.leverage
+            }
+        return order_dict
+    
+    def _track_status(self, order: Order) -> None:
+        """Keep the per-status order counts in step with an order's current status."""
+        previous = self._order_statuses.get(order.id)
+        if previous != order.status:
+            if previous is not None:
+                self._status_counts[previous] -= 1
+            self._status_counts[order.status] += 1
+            self._order_statuses[order.id] = order.status
+    
     def cancel_order(self, order_id: str, user_id: str) -> Dict:
         """Cancel an order."""
         order = self.order_book.get_order(order_id)
@@ -195,6 +240,7 @@ class OrderMatchingEngine:
         
         if success:
             order.status = "cancelled"
+            self._track_status(order)
             return {
                 "valid": True,
                 "message": f"Order {order_id} cancelled successfully"
@@ -212,29 +258,42 @@ class OrderMatchingEngine:
         if not order:
             return None
         
+        return self._order_status_dict(order)
+    
+    def _order_status_dict(self, order: Order) -> Dict:
+        """Build an order's status dict, converting the fields fixed at placement only once."""
+        cached = self._order_status_cache.get(order.id)
+        if cached is None:
+            cached = self._order_status_cache[order.id] = (
+                {
+                    "order_id": order.id,
+                    "user_id": order.user_id,
+                    "side": order.side.value,
+                    "order_type": order.order_type.value,
+                    "quantity": float(order.quantity),
+                    "price": float(order.price),
+                    "leverage": order.leverage
+                },
+                order.timestamp.isoformat()
+            )
+        fixed_fields, timestamp = cached
+        
         return {
-            "order_id": order.id,
-            "user_id": order.user_id,
-            "side": order.side.value,
-            "order_type": order.order_type.value,
-            "quantity": float(order.quantity),
-            "price": float(order.price),
-            "leverage": order.leverage,
+            **fixed_fields,
             "filled_quantity": float(order.filled_quantity),
             "remaining_quantity": float(order.remaining_quantity),
             "status": order.status,
-            "timestamp": order.timestamp.isoformat()
+            "timestamp": timestamp
         }
     
     def get_user_orders(self, user_id: str) -> List[Dict]:
         """Get all orders for a user."""
-        user_orders = []
-        
-        for order in self.order_history:
-            if order.user_id == user_id:
-                user_orders.append(self.get_order_status(order.id))
-        
-        return user_orders
+        # Cancelled orders leave the book and report no status, as in get_order_status
+        book_orders = self.order_book.orders
+        return [
+            self._order_status_dict(order) if order.id in book_orders else None
+            for order in self._orders_by_user.get(user_id, [])
+        ]
     
     def get_market_depth(self, levels: int = 5) -> Dict:
         """Get market depth."""
@@ -250,7 +309,12 @@ class OrderMatchingEngine:
     
     def get_trade_history(self, limit: int = 100) -> List[Dict]:
         """Get recent trade history."""
-        return self.trade_history[-limit:] if limit else self.trade_history
+        if not limit:
+            return list(self.trade_history)
+        if limit < 0:
+            # Same as slicing a list with [-limit:]: all but the oldest -limit trades
+            return list(islice(self.trade_history, -limit, None))
+        return list(islice(reversed(self.trade_history), limit))[::-1]
     
     def get_order_book_summary(self) -> Dict:
         """Get order book summary."""
@@ -272,22 +336,21 @@ class OrderMatchingEngine:
         leverage: int = 1
     ) -> Dict:
         """Simulate a market order by placing at best available price."""
-        best_prices = self.get_best_prices()
-        
+        # Use the book's Decimal prices directly rather than a float round-trip
         if side == OrderSide.BUY:
-            if not best_prices["best_ask"]:
+            price = self.order_book.get_best_ask()
+            if not price:
                 return {
                     "valid": False,
                     "message": "No sell orders available for market buy"
                 }
-            price = Decimal(str(best_prices["best_ask"]))
         else:
-            if not best_prices["best_bid"]:
+            price = self.order_book.get_best_bid()
+            if not price:
                 return {
                     "valid": False,
                     "message": "No buy orders available for market sell"
                 }
-            price = Decimal(str(best_prices["best_bid"]))
         
         # Create market order
         order = Order(
@@ -303,15 +366,15 @@ class OrderMatchingEngine:
     
     def get_execution_statistics(self) -> Dict:
         """Get execution statistics."""
-        total_trades = len(self.trade_history)
-        total_volume = sum(trade["quantity"] * trade["price"] for trade in self.trade_history)
+        total_trades = self._total_trades
+        total_volume = self._total_notional
         
         # Calculate average trade size
         avg_trade_size = total_volume / total_trades if total_trades > 0 else 0
         
-        # Count filled vs partially filled orders
-        filled_orders = sum(1 for order in self.order_history if order.status == "filled")
-        partial_orders = sum(1 for order in self.order_history if order.status == "partially_filled")
+        # Filled vs partially filled orders, counted as their status changes
+        filled_orders = self._status_counts["filled"]
+        partial_orders = self._status_counts["partially_filled"]
         
         return {
             "total_trades": total_trades,
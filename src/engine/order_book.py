@@ -1,41 +1,54 @@
 """
-Efficient Order Book implementation using priority queues for price levels.
+Efficient Order Book implementation using sorted price lists for price levels.
 """
-import heapq
+import bisect
 from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from itertools import islice
 
 from src.models.data_models import Order, OrderSide, Trade
 
+# Shared zero for quantity checks, parsed once instead of per comparison
+_ZERO = Decimal('0')
+
+# Order statuses that can no longer be cancelled
+_CLOSED_STATUSES = ("filled", "cancelled")
+
 
 class PriceLevel:
     """Represents a price level in the order book."""
     
+    __slots__ = ('price', 'orders', 'total_quantity')
+    
     def __init__(self, price: Decimal):
         self.price = price
-        self.orders: List[Order] = []
-        self.total_quantity = Decimal('0')
+        # Orders in time priority, keyed by ID for O(1) removal
+        self.orders: Dict[str, Order] = OrderedDict()
+        self.total_quantity = _ZERO
     
     def add_order(self, order: Order) -> None:
         """Add an order to this price level."""
-        self.orders.append(order)
+        self.orders[order.id] = order
         self.total_quantity += order.remaining_quantity
     
     def remove_order(self, order: Order) -> None:
         """Remove an order from this price level."""
-        if order in self.orders:
-            self.orders.remove(order)
+        # One keyed pop both checks that the order rests here and detaches it
+        if self.orders.pop(order.id, None) is not None:
             self.total_quantity -= order.remaining_quantity
     
-    def update_order(self, order: Order) -> None:
-        """Update an order's filled quantity."""
-        # Recalculate total quantity
-        self.total_quantity = sum(o.remaining_quantity for o in self.orders)
+    def update_order(self, filled_quantity: Decimal) -> None:
+        """Record a fill of filled_quantity against an order at this price level."""
+        self.total_quantity -= filled_quantity
     
     def get_orders(self) -> List[Order]:
         """Get all orders at this price level."""
-        return self.orders.copy()
+        return list(self.orders.values())
+    
+    def first_order(self) -> Order:
+        """Get the oldest order at this price level."""
+        return next(iter(self.orders.values()))
     
     def is_empty(self) -> bool:
         """Check if this price level is empty."""
@@ -46,13 +59,13 @@ class OrderBook:
     """Efficient order book implementation with O(log n) operations."""
     
     def __init__(self):
-        # Price levels for buy orders (max heap - highest price first)
+        # Price levels for buy orders, prices sorted ascending (best bid last)
         self.buy_levels: Dict[Decimal, PriceLevel] = {}
-        self.buy_prices: List[Tuple[Decimal, Decimal]] = []  # (-price, price) for max heap
+        self.buy_prices: List[Decimal] = []
         
-        # Price levels for sell orders (min heap - lowest price first)
+        # Price levels for sell orders, prices sorted ascending (best ask first)
         self.sell_levels: Dict[Decimal, PriceLevel] = {}
-        self.sell_prices: List[Tuple[Decimal, Decimal]] = []  # (price, price) for min heap
+        self.sell_prices: List[Decimal] = []
         
         # Order lookup for O(1) access
         self.orders: Dict[str, Order] = {}
@@ -60,6 +73,9 @@ class OrderBook:
         # Track best bid/ask
         self.best_bid: Optional[Decimal] = None
         self.best_ask: Optional[Decimal] = None
+        
+        # Running total of resting quantity on both sides
+        self._total_volume = _ZERO
     
     def add_order(self, order: Order) -> List[Trade]:
         """Add an order to the book and return any trades executed."""
@@ -68,67 +84,82 @@ class OrderBook:
         # Store order for lookup
         self.orders[order.id] = order
         
+        # Only enter matching when the order crosses the cached best opposite price
         if order.side == OrderSide.BUY:
-            trades = self._match_buy_order(order)
-            if order.remaining_quantity > Decimal('0'):
+            if self.best_ask is not None and self.best_ask <= order.price:
+                trades = self._match_buy_order(order)
+            if order.remaining_quantity > _ZERO:
                 self._add_buy_order(order)
         else:
-            trades = self._match_sell_order(order)
-            if order.remaining_quantity > Decimal('0'):
+            if self.best_bid is not None and self.best_bid >= order.price:
+                trades = self._match_sell_order(order)
+            if order.remaining_quantity > _ZERO:
                 self._add_sell_order(order)
         
-        self._update_best_prices()
         return trades
     
     def _match_buy_order(self, buy_order: Order) -> List[Trade]:
         """Match a buy order against sell orders."""
         trades = []
         
-        while (buy_order.remaining_quantity > Decimal('0') and 
-               self.sell_prices and 
-               self.sell_prices[0][1] <= buy_order.price):
-            
-            best_ask_price = self.sell_prices[0][1]
-            sell_level = self.sell_levels[best_ask_price]
-            
-            if sell_level.is_empty():
-                heapq.heappop(self.sell_prices)
-                continue
-            
-            # Get the first sell order (FIFO)
-            sell_order = sell_level.orders[0]
-            
-            # Calculate trade quantity
-            trade_quantity = min(buy_order.remaining_quantity, sell_order.remaining_quantity)
-            
-            # Execute trade
-            trade = Trade(
-                buy_order_id=buy_order.id,
-                sell_order_id=sell_order.id,
-                quantity=trade_quantity,
-                price=best_ask_price
-            )
-            trades.append(trade)
+        # Track the incoming order's price and remaining quantity locally, and
+        # bind the book's structures once rather than per fill
+        limit_price = buy_order.price
+        remaining = starting_quantity = buy_order.remaining_quantity
+        sell_prices = self.sell_prices
+        sell_levels = self.sell_levels
+        buy_order_id = buy_order.id
+        
+        while (remaining > _ZERO and 
+               sell_prices and 
+               sell_prices[0] <= limit_price):
             
-            # Update order quantities
-            buy_order.filled_quantity += trade_quantity
-            sell_order.filled_quantity += trade_quantity
+            best_ask_price = sell_prices[0]
+            sell_level = sell_levels[best_ask_price]
             
-            # Update order status
-            if buy_order.is_filled:
-                buy_order.status = "filled"
-            elif buy_order.is_partially_filled:
-                buy_order.status = "partially_filled"
+            # Sweep this level's orders in time priority until either side runs out
+            while remaining > _ZERO and not sell_level.is_empty():
+                # Get the first sell order (FIFO)
+                sell_order = sell_level.first_order()
+                
+                # Calculate trade quantity
+                sell_remaining = sell_order.remaining_quantity
+                trade_quantity = min(remaining, sell_remaining)
+                
+                # Execute trade. Trades are handed to callers and the position manager,
+                # so every fill gets its own Trade rather than a recycled record
+                trade = Trade(
+                    buy_order_id=buy_order_id,
+                    sell_order_id=sell_order.id,
+                    quantity=trade_quantity,
+                    price=best_ask_price
+                )
+                trades.append(trade)
+                
+                # Update resting order quantity and status from the quantities at hand
+                sell_order.filled_quantity += trade_quantity
+                remaining -= trade_quantity
+                sell_level.update_order(trade_quantity)
+                
+                if trade_quantity == sell_remaining:
+                    sell_order.status = "filled"
+                    sell_level.remove_order(sell_order)
+                else:
+                    sell_order.status = "partially_filled"
             
-            if sell_order.is_filled:
-                sell_order.status = "filled"
-                sell_level.remove_order(sell_order)
-                if sell_level.is_empty():
-                    heapq.heappop(self.sell_prices)
-                    del self.sell_levels[best_ask_price]
-            elif sell_order.is_partially_filled:
-                sell_order.status = "partially_filled"
-                sell_level.update_order(sell_order)
+            if sell_level.is_empty():
+                del sell_prices[0]
+                del sell_levels[best_ask_price]
+        
+        # Apply the incoming order's fills in one step. Every fill is positive,
+        # so any trade leaves it filled or partially filled
+        if trades:
+            buy_order.filled_quantity += starting_quantity - remaining
+            buy_order.status = "filled" if remaining == _ZERO else "partially_filled"
+        
+        # Resting sell volume drops by whatever the buy order filled
+        self._total_volume -= starting_quantity - remaining
+        self.best_ask = sell_prices[0] if sell_prices else None
         
         return trades
     
@@ -136,51 +167,63 @@ class OrderBook:
         """Match a sell order against buy orders."""
         trades = []
         
-        while (sell_order.remaining_quantity > Decimal('0') and 
-               self.buy_prices and 
-               self.buy_prices[0][1] >= sell_order.price):
-            
-            best_bid_price = self.buy_prices[0][1]
-            buy_level = self.buy_levels[best_bid_price]
-            
-            if buy_level.is_empty():
-                heapq.heappop(self.buy_prices)
-                continue
-            
-            # Get the first buy order (FIFO)
-            buy_order = buy_level.orders[0]
-            
-            # Calculate trade quantity
-            trade_quantity = min(sell_order.remaining_quantity, buy_order.remaining_quantity)
-            
-            # Execute trade
-            trade = Trade(
-                buy_order_id=buy_order.id,
-                sell_order_id=sell_order.id,
-                quantity=trade_quantity,
-                price=best_bid_price
-            )
-            trades.append(trade)
+        # Track the incoming order's price and remaining quantity locally, and
+        # bind the book's structures once rather than per fill
+        limit_price = sell_order.price
+        remaining = starting_quantity = sell_order.remaining_quantity
+        buy_prices = self.buy_prices
+        buy_levels = self.buy_levels
+        sell_order_id = sell_order.id
+        
+        while (remaining > _ZERO and 
+               buy_prices and 
+               buy_prices[-1] >= limit_price):
             
-            # Update order quantities
-            sell_order.filled_quantity += trade_quantity
-            buy_order.filled_quantity += trade_quantity
+            best_bid_price = buy_prices[-1]
+            buy_level = buy_levels[best_bid_price]
             
-            # Update order status
-            if sell_order.is_filled:
-                sell_order.status = "filled"
-            elif sell_order.is_partially_filled:
-                sell_order.status = "partially_filled"
+            # Sweep this level's orders in time priority until either side runs out
+            while remaining > _ZERO and not buy_level.is_empty():
+                # Get the first buy order (FIFO)
+                buy_order = buy_level.first_order()
+                
+                # Calculate trade quantity
+                buy_remaining = buy_order.remaining_quantity
+                trade_quantity = min(remaining, buy_remaining)
+                
+                # Execute trade
+                trade = Trade(
+                    buy_order_id=buy_order.id,
+                    sell_order_id=sell_order_id,
+                    quantity=trade_quantity,
+                    price=best_bid_price
+                )
+                trades.append(trade)
+                
+                # Update resting order quantity and status from the quantities at hand
+                buy_order.filled_quantity += trade_quantity
+                remaining -= trade_quantity
+                buy_level.update_order(trade_quantity)
+                
+                if trade_quantity == buy_remaining:
+                    buy_order.status = "filled"
+                    buy_level.remove_order(buy_order)
+                else:
+                    buy_order.status = "partially_filled"
             
-            if buy_order.is_filled:
-                buy_order.status = "filled"
-                buy_level.remove_order(buy_order)
-                if buy_level.is_empty():
-                    heapq.heappop(self.buy_prices)
-                    del self.buy_levels[best_bid_price]
-            elif buy_order.is_partially_filled:
-                buy_order.status = "partially_filled"
-                buy_level.update_order(buy_order)
+            if buy_level.is_empty():
+                buy_prices.pop()
+                del buy_levels[best_bid_price]
+        
+        # Apply the incoming order's fills in one step. Every fill is positive,
+        # so any trade leaves it filled or partially filled
+        if trades:
+            sell_order.filled_quantity += starting_quantity - remaining
+            sell_order.status = "filled" if remaining == _ZERO else "partially_filled"
+        
+        # Resting buy volume drops by whatever the sell order filled
+        self._total_volume -= starting_quantity - remaining
+        self.best_bid = buy_prices[-1] if buy_prices else None
         
         return trades
     
@@ -190,9 +233,13 @@ class OrderBook:
         
         if price not in self.buy_levels:
             self.buy_levels[price] = PriceLevel(price)
-            heapq.heappush(self.buy_prices, (-price, price))  # Negative for max heap
+            bisect.insort(self.buy_prices, price)
         
         self.buy_levels[price].add_order(order)
+        self._total_volume += order.remaining_quantity
+        
+        if self.best_bid is None or price > self.best_bid:
+            self.best_bid = price
     
     def _add_sell_order(self, order: Order) -> None:
         """Add a sell order to the book."""
@@ -200,53 +247,49 @@ class OrderBook:
         
         if price not in self.sell_levels:
             self.sell_levels[price] = PriceLevel(price)
-            heapq.heappush(self.sell_prices, (price, price))  # Min heap
+            bisect.insort(self.sell_prices, price)
         
         self.sell_levels[price].add_order(order)
-    
-    def _update_best_prices(self) -> None:
-        """Update best bid and ask prices."""
-        self.best_bid = None
-        self.best_ask = None
+        self._total_volume += order.remaining_quantity
         
-        if self.buy_prices:
-            self.best_bid = self.buy_prices[0][1]
-        
-        if self.sell_prices:
-            self.best_ask = self.sell_prices[0][1]
+        if self.best_ask is None or price < self.best_ask:
+            self.best_ask = price
     
     def cancel_order(self, order_id: str) -> bool:
         """Cancel an order."""
-        if order_id not in self.orders:
+        order = self.orders.get(order_id)
+        if order is None:
             return False
         
-        order = self.orders[order_id]
-        if order.status in ["filled", "cancelled"]:
+        if order.status in _CLOSED_STATUSES:
             return False
         
         order.status = "cancelled"
         
         if order.side == OrderSide.BUY:
             price = order.price
-            if price in self.buy_levels:
-                self.buy_levels[price].remove_order(order)
-                if self.buy_levels[price].is_empty():
+            level = self.buy_levels.get(price)
+            if level is not None:
+                resting_quantity = level.total_quantity
+                level.remove_order(order)
+                self._total_volume -= resting_quantity - level.total_quantity
+                if level.is_empty():
                     del self.buy_levels[price]
-                    # Remove from heap
-                    self.buy_prices = [(p, p) for p, _ in self.buy_prices if p != -price]
-                    heapq.heapify(self.buy_prices)
+                    del self.buy_prices[bisect.bisect_left(self.buy_prices, price)]
+                    self.best_bid = self.buy_prices[-1] if self.buy_prices else None
         else:
             price = order.price
-            if price in self.sell_levels:
-                self.sell_levels[price].remove_order(order)
-                if self.sell_levels[price].is_empty():
+            level = self.sell_levels.get(price)
+            if level is not None:
+                resting_quantity = level.total_quantity
+                level.remove_order(order)
+                self._total_volume -= resting_quantity - level.total_quantity
+                if level.is_empty():
                     del self.sell_levels[price]
-                    # Remove from heap
-                    self.sell_prices = [(p, p) for p, _ in self.sell_prices if p != price]
-                    heapq.heapify(self.sell_prices)
+                    del self.sell_prices[bisect.bisect_left(self.sell_prices, price)]
+                    self.best_ask = self.sell_prices[0] if self.sell_prices else None
         
         del self.orders[order_id]
-        self._update_best_prices()
         return True
     
     def get_order(self, order_id: str) -> Optional[Order]:
@@ -269,39 +312,20 @@ class OrderBook:
     
     def get_market_depth(self, levels: int = 5) -> Dict[str, List[Tuple[Decimal, Decimal]]]:
         """Get market depth for both sides."""
-        buy_depth = []
-        sell_depth = []
-        
-        # Get buy side (highest prices first)
-        buy_prices_copy = self.buy_prices.copy()
-        for _ in range(min(levels, len(buy_prices_copy))):
-            if not buy_prices_copy:
-                break
-            price = heapq.heappop(buy_prices_copy)[1]
-            if price in self.buy_levels:
-                quantity = self.buy_levels[price].total_quantity
-                buy_depth.append((price, quantity))
-        
-        # Get sell side (lowest prices first)
-        sell_prices_copy = self.sell_prices.copy()
-        for _ in range(min(levels, len(sell_prices_copy))):
-            if not sell_prices_copy:
-                break
-            price = heapq.heappop(sell_prices_copy)[1]
-            if price in self.sell_levels:
-                quantity = self.sell_levels[price].total_quantity
-                sell_depth.append((price, quantity))
+        # Every listed price has a live level, so read the sorted ends directly
+        levels = max(levels, 0)
+        buy_levels = self.buy_levels
+        sell_levels = self.sell_levels
         
         return {
-            "bids": buy_depth,
-            "asks": sell_depth
+            # Highest bids first
+            "bids": [(price, buy_levels[price].total_quantity)
+                     for price in islice(reversed(self.buy_prices), levels)],
+            # Lowest asks first
+            "asks": [(price, sell_levels[price].total_quantity)
+                     for price in islice(self.sell_prices, levels)]
         }
     
     def get_total_volume(self) -> Decimal:
         """Get total volume in the order book."""
-        total = Decimal('0')
-        for level in self.buy_levels.values():
-            total += level.total_quantity
-        for level in self.sell_levels.values():
-            total += level.total_quantity
-        return total
+        return self._total_volume
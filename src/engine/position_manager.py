@@ -9,6 +9,19 @@ from src.models.data_models import (
     User, Position, PositionSide, Order, OrderSide, Trade, MarketData
 )
 
+# The single market the engine trades; positions are stored under this symbol
+DEFAULT_SYMBOL = "BTC/USD"
+
+# Direction of a position's exposure: PNL = sign * (price - entry_price) * quantity
+POSITION_SIDE_SIGN = {PositionSide.LONG: 1, PositionSide.SHORT: -1}
+
+# Decimal constants for the trade, funding and liquidation paths, parsed once at import
+DECIMAL_ZERO = Decimal('0')
+LIQUIDATION_FEE_RATE = Decimal('0.01')
+
+# Decimal leverage for every valid leverage setting
+LEVERAGE_DECIMALS = {leverage: Decimal(leverage) for leverage in range(1, 11)}
+
 
 class PositionManager:
     """Manages user positions and PNL calculations."""
@@ -16,10 +29,21 @@ class PositionManager:
     def __init__(self):
         self.users: Dict[str, User] = {}
         self.market_data: Optional[MarketData] = None
+        # Open positions by user ID, so sweeps skip users without a position
+        self._open_positions: Dict[str, Position] = {}
+        # Liquidatable positions as of the last PNL sweep, None once positions change
+        self._liquidatable_positions: Optional[List[Position]] = None
     
     def add_user(self, user: User) -> None:
         """Add a user to the position manager."""
         self.users[user.id] = user
+        self._liquidatable_positions = None
+        
+        position = user.get_position(DEFAULT_SYMBOL)
+        if position:
+            self._open_positions[user.id] = position
+        else:
+            self._open_positions.pop(user.id, None)
     
     def get_user(self, user_id: str) -> Optional[User]:
         """Get a user by ID."""
@@ -38,6 +62,8 @@ class PositionManager:
         if not buy_user or not sell_user:
             return
         
+        self._liquidatable_positions = None
+        
         # Process buy side
         self._process_trade_for_user(
             buy_user, trade, buy_order, PositionSide.LONG
@@ -56,8 +82,7 @@ class PositionManager:
         side: PositionSide
     ) -> None:
         """Process a trade for a specific user."""
-        symbol = "BTC/USD"  # Default symbol
-        current_position = user.get_position(symbol)
+        current_position = user.get_position(DEFAULT_SYMBOL)
         
         if current_position is None:
             # Create new position
@@ -76,7 +101,8 @@ class PositionManager:
                 leverage=order.leverage,
                 collateral=required_collateral
             )
-            user.add_position(position, symbol)
+            user.add_position(position, DEFAULT_SYMBOL)
+            self._open_positions[user.id] = position
         else:
             # Update existing position
             if current_position.side == side:
@@ -94,7 +120,10 @@ class PositionManager:
     ) -> Decimal:
         """Calculate required collateral for a position."""
         position_value = quantity * price
-        return position_value / Decimal(str(leverage))
+        leverage_decimal = LEVERAGE_DECIMALS.get(leverage)
+        if leverage_decimal is None:
+            leverage_decimal = Decimal(str(leverage))
+        return position_value / leverage_decimal
     
     def _increase_position(
         self, 
@@ -108,7 +137,7 @@ class PositionManager:
         new_value = trade.quantity * trade.price
         total_quantity = position.quantity + trade.quantity
         
-        if total_quantity > Decimal('0'):
+        if total_quantity > DECIMAL_ZERO:
             position.entry_price = (old_value + new_value) / total_quantity
         
         # Update quantity and collateral
@@ -138,10 +167,7 @@ class PositionManager:
     def _close_position(self, position: Position, trade: Trade) -> None:
         """Close a position completely."""
         # Calculate realized PNL
-        if position.side == PositionSide.LONG:
-            realized_pnl = (trade.price - position.entry_price) * position.quantity
-        else:
-            realized_pnl = (position.entry_price - trade.price) * position.quantity
+        realized_pnl = POSITION_SIDE_SIGN[position.side] * (trade.price - position.entry_price) * position.quantity
         
         # Update user's realized PNL
         user = self.users[position.user_id]
@@ -151,15 +177,13 @@ class PositionManager:
         user.collateral += position.collateral
         
         # Remove position
-        user.remove_position("BTC/USD")
+        user.remove_position(DEFAULT_SYMBOL)
+        self._open_positions.pop(position.user_id, None)
     
     def _partial_close_position(self, position: Position, trade: Trade) -> None:
         """Partially close a position."""
         # Calculate realized PNL for closed portion
-        if position.side == PositionSide.LONG:
-            realized_pnl = (trade.price - position.entry_price) * trade.quantity
-        else:
-            realized_pnl = (position.entry_price - trade.price) * trade.quantity
+        realized_pnl = POSITION_SIDE_SIGN[position.side] * (trade.price - position.entry_price) * trade.quantity
         
         # Update user's realized PNL
         user = self.users[position.user_id]
@@ -182,136 +206,108 @@ class PositionManager:
             return
         
         current_price = self.market_data.mark_price
+        side_sign = POSITION_SIDE_SIGN
+        liquidatable = []
         
-        for user in self.users.values():
-            position = user.get_position("BTC/USD")
-            if position:
-                self._update_position_pnl(position, current_price)
+        # Single flat pass with the mark price bound once; the per-position
+        # update is inlined instead of dispatched through a method call per user.
+        # Liquidation status only changes with the PNL, so it is checked here too.
+        # Unary plus turns the -0 of a short at its entry price back into 0.
+        for position in self._open_positions.values():
+            position.unrealized_pnl = +(
+                side_sign[position.side] * (current_price - position.entry_price) * position.quantity
+            )
+            if position.is_liquidatable:
+                liquidatable.append(position)
+        
+        self._liquidatable_positions = liquidatable
     
     def _update_position_pnl(self, position: Position, current_price: Decimal) -> None:
         """Update PNL for a specific position."""
-        if position.side == PositionSide.LONG:
-            position.unrealized_pnl = (current_price - position.entry_price) * position.quantity
-        else:
-            position.unrealized_pnl = (position.entry_price - current_price) * position.quantity
+        # Unary plus turns the -0 of a short at its entry price back into 0
+        position.unrealized_pnl = +(
+            POSITION_SIDE_SIGN[position.side] * (current_price - position.entry_price) * position.quantity
+        )
     
     def get_liquidatable_positions(self) -> List[Position]:
         """Get all positions that can be liquidated."""
-        liquidatable = []
-        
-        for user in self.users.values():
-            position = user.get_position("BTC/USD")
-            if position and position.is_liquidatable:
-                liquidatable.append(position)
-        
-        return liquidatable
+        # Positions are only rescanned if a trade, funding or liquidation
+        # touched them since the last PNL sweep
+        if self._liquidatable_positions is None:
+            self._liquidatable_positions = [
+                position for position in self._open_positions.values()
+                if position.is_liquidatable
+            ]
+        
+        return list(self._liquidatable_positions)
     
     def liquidate_position(self, position: Position) -> Decimal:
         """Liquidate a position and return liquidation fee."""
         user = self.users[position.user_id]
         
         if not self.market_data:
-            return Decimal('0')
+            return DECIMAL_ZERO
         
         # Calculate liquidation price (current mark price)
         liquidation_price = self.market_data.mark_price
         
         # Calculate realized PNL
-        if position.side == PositionSide.LONG:
-            realized_pnl = (liquidation_price - position.entry_price) * position.quantity
-        else:
-            realized_pnl = (position.entry_price - liquidation_price) * position.quantity
+        realized_pnl = POSITION_SIDE_SIGN[position.side] * (liquidation_price - position.entry_price) * position.quantity
         
         # Calculate liquidation fee (1% of position value)
         position_value = position.quantity * liquidation_price
-        liquidation_fee = position_value * Decimal('0.01')
+        liquidation_fee = position_value * LIQUIDATION_FEE_RATE
         
         # Update user's realized PNL
         user.total_realized_pnl += realized_pnl
         
         # Return remaining collateral after liquidation fee
         remaining_collateral = position.collateral + realized_pnl - liquidation_fee
-        user.collateral += max(Decimal('0'), remaining_collateral)
+        user.collateral += max(DECIMAL_ZERO, remaining_collateral)
         
         # Remove position
-        user.remove_position("BTC/USD")
+        user.remove_position(DEFAULT_SYMBOL)
+        self._open_positions.pop(position.user_id, None)
+        self._liquidatable_positions = None
         
         return liquidation_fee
     
     def apply_funding(self) -> Dict[str, Decimal]:
         """Apply funding rates to all positions."""
-        if not self.market_data or self.market_data.funding_rate == Decimal('0'):
+        if not self.market_data or self.market_data.funding_rate == DECIMAL_ZERO:
             return {}
         
         funding_payments = {}
-        
-        for user in self.users.values():
-            position = user.get_position("BTC/USD")
-            if position:
-                funding_payment = self._calculate_funding_payment(position)
-                position.funding_paid += funding_payment
-                user.collateral -= funding_payment
-                funding_payments[user.id] = funding_payment
-        
-        return funding_payments
-    
-    def _calculate_funding_payment(self, position: Position) -> Decimal:
-        """Calculate funding payment for a position."""
-        if not self.market_data:
-            return Decimal('0')
-        
-        position_value = position.quantity * self.market_data.mark_price
+        mark_price = self.market_data.mark_price
         funding_rate = self.market_data.funding_rate
+        # Longs pay a positive rate and shorts a negative one; resolve both once per sweep
+        side_rates = {PositionSide.LONG: funding_rate, PositionSide.SHORT: -funding_rate}
         
-        if position.side == PositionSide.LONG:
-            # Long positions pay funding when rate is positive
-            return position_value * funding_rate
-        else:
-            # Short positions pay funding when rate is negative
-            return position_value * (-funding_rate)
-    
-    def get_liquidatable_positions(self) -> List[Position]:
-        """Get all positions that can be liquidated."""
+        users = self.users
         liquidatable = []
         
-        for user in self.users.values():
-            position = user.get_position("BTC/USD")
-            if position and position.is_liquidatable:
+        # Funding changes the positions, so their liquidation status is
+        # refreshed in the same pass rather than by a later rescan
+        for user_id, position in self._open_positions.items():
+            funding_payment = position.quantity * mark_price * side_rates[position.side]
+            position.funding_paid += funding_payment
+            users[user_id].collateral -= funding_payment
+            funding_payments[user_id] = funding_payment
+            if position.is_liquidatable:
                 liquidatable.append(position)
         
-        return liquidatable
-    
-    def apply_funding(self) -> Dict[str, Decimal]:
-        """Apply funding rates to all positions."""
-        if not self.market_data or self.market_data.funding_rate == Decimal('0'):
-            return {}
-        
-        funding_payments = {}
-        
-        for user in self.users.values():
-            position = user.get_position("BTC/USD")
-            if position:
-                funding_payment = self._calculate_funding_payment(position)
-                position.funding_paid += funding_payment
-                user.collateral -= funding_payment
-                funding_payments[user.id] = funding_payment
-        
+        self._liquidatable_positions = liquidatable
         return funding_payments
     
     def _calculate_funding_payment(self, position: Position) -> Decimal:
         """Calculate funding payment for a position."""
         if not self.market_data:
-            return Decimal('0')
+            return DECIMAL_ZERO
         
         position_value = position.quantity * self.market_data.mark_price
-        funding_rate = self.market_data.funding_rate
         
-        if position.side.value == "long":
-            # Long positions pay funding when rate is positive
-            return position_value * funding_rate
-        else:
-            # Short positions pay funding when rate is negative
-            return position_value * (-funding_rate)
+        # Longs pay funding when the rate is positive, shorts when it is negative
+        return POSITION_SIDE_SIGN[position.side] * position_value * self.market_data.funding_rate
     
     def get_user_summary(self, user_id: str) -> Optional[Dict]:
         """Get a summary of a user's account."""
@@ -319,7 +315,11 @@ class PositionManager:
         if not user:
             return None
         
-        position = user.get_position("BTC/USD")
+        return self._user_summary(user_id, user)
+    
+    def _user_summary(self, user_id: str, user: User) -> Dict:
+        """Build the account summary of a user already looked up."""
+        position = self._open_positions.get(user_id)
         
         summary = {
             "user_id": user_id,
@@ -345,7 +345,9 @@ class PositionManager:
     
     def get_all_user_summaries(self) -> Dict[str, Dict]:
         """Get summaries for all users."""
+        # One pass over the users, skipping get_user_summary's per-user lookup
+        user_summary = self._user_summary
         return {
-            user_id: self.get_user_summary(user_id)
-            for user_id in self.users.keys()
+            user_id: user_summary(user_id, user)
+            for user_id, user in self.users.items()
         }
@@ -3,25 +3,108 @@ Price Oracle simulation with mock data generation.
 """
 import random
 import math
-from typing import List, Optional
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from typing import List, Optional, Tuple
 from decimal import Decimal
 from datetime import datetime, timedelta
 
 from src.models.data_models import MarketData
 
 
+# Most recent prices kept in memory; statistics cover this window
+MAX_PRICE_HISTORY = 1_000_000
+
+# Time step of one hour in days, and its square root, for the Decimal GBM step
+_DT = Decimal('1') / Decimal('24')
+_SQRT_DT = Decimal(str(math.sqrt(float(_DT))))
+
+# Bounds applied by simulate_price_movement
+_MIN_PRICE = Decimal('1000')
+_MAX_PRICE = Decimal('200000')
+
+
+@lru_cache(maxsize=128, typed=True)
+def _gbm_step_coefficients(volatility: float, trend: float) -> Tuple[Decimal, Decimal]:
+    """Drift and shock scale of one Decimal GBM step, parsed once per parameter pair."""
+    return Decimal(str(trend)) * _DT, Decimal(str(volatility)) * _SQRT_DT
+
+
+def _gbm_path(
+    initial_price: float, 
+    hours: int, 
+    volatility: float, 
+    trend: float,
+    max_price: float = math.inf
+) -> List[float]:
+    """Generate an hourly geometric Brownian motion path on floats.
+    
+    The whole path is computed without Decimal; callers convert the result
+    once at the boundary.
+    """
+    # Geometric Brownian motion: dS = S * (μ*dt + σ*√dt*Z)
+    # where μ is drift (trend), σ is volatility, Z is standard normal
+    dt = 1 / 24  # 1 hour = 1/24 day
+    drift = trend * dt
+    diffusion_scale = volatility * math.sqrt(dt)
+    # random.gauss already produces its normals in pairs, and is the cheapest
+    # sampler in the standard library. Drawing from the module-level generator
+    # keeps paths reproducible under random.seed().
+    gauss = random.gauss
+    
+    prices = []
+    price = initial_price
+    for _ in range(hours):
+        price_change = price * (drift + diffusion_scale * gauss(0, 1))
+        
+        # Ensure price stays positive (and below max_price)
+        price += price_change
+        if price < 1000.0:
+            price = 1000.0
+        elif price > max_price:
+            price = max_price
+        prices.append(price)
+    
+    return prices
+
+
+def _shock_scenario_path(
+    initial_price: float, 
+    hours: int, 
+    shock_hour: int, 
+    shock_factor: float
+) -> List[float]:
+    """Hourly 2% volatility moves with the price multiplied by shock_factor at shock_hour.
+    
+    Matches stepping a PriceOracle with simulate_price_movement, and with a
+    single spike or crash at shock_hour, but computes the path in bulk.
+    """
+    if not 0 <= shock_hour < hours:
+        return _gbm_path(initial_price, hours, 0.02, 0.0, 200000.0)
+    
+    path = _gbm_path(initial_price, shock_hour, 0.02, 0.0, 200000.0)
+    shocked_price = (path[-1] if path else initial_price) * shock_factor
+    path.append(shocked_price)
+    path.extend(_gbm_path(shocked_price, hours - shock_hour - 1, 0.02, 0.0, 200000.0))
+    return path
+
+
 class PriceOracle:
     """Simulates price oracle with mock data generation."""
     
     def __init__(self, initial_price: Decimal = Decimal('60000')):
         self.current_price = initial_price
-        self.price_history: List[Decimal] = [initial_price]
-        self.timestamps: List[datetime] = [datetime.now()]
+        self.price_history: deque = deque([initial_price], maxlen=MAX_PRICE_HISTORY)
+        self.timestamps: deque = deque([datetime.now()], maxlen=MAX_PRICE_HISTORY)
         self.market_data = MarketData(
             symbol="BTC/USD",
             mark_price=initial_price,
             index_price=initial_price
         )
+        # Float copy of price_history for statistics, and the last statistics computed
+        self._float_prices: deque = deque([float(initial_price)], maxlen=MAX_PRICE_HISTORY)
+        self._price_statistics: Optional[dict] = None
     
     def generate_price_series(
         self, 
@@ -30,40 +113,23 @@ class PriceOracle:
         trend: float = 0.0
     ) -> List[Decimal]:
         """Generate a series of prices using geometric Brownian motion."""
-        prices = [self.current_price]
-        dt = Decimal('1') / Decimal('24')  # 1 hour = 1/24 day
-        
-        for i in range(hours):
-            # Geometric Brownian motion: dS = S * (μ*dt + σ*√dt*Z)
-            # where μ is drift (trend), σ is volatility, Z is standard normal
-            
-            # Random shock
-            z = Decimal(str(random.gauss(0, 1)))
-            
-            # Price change
-            drift = Decimal(str(trend)) * dt
-            diffusion = Decimal(str(volatility)) * Decimal(str(math.sqrt(float(dt)))) * z
-            
-            price_change = prices[-1] * (drift + diffusion)
-            new_price = prices[-1] + price_change
-            
-            # Ensure price stays positive
-            new_price = max(new_price, Decimal('1000'))
-            
-            prices.append(new_price)
-        
-        return prices[1:]  # Exclude initial price
+        path = _gbm_path(float(self.current_price), hours, volatility, trend)
+        return [Decimal(str(price)) for price in path]
     
     def update_price(self, new_price: Decimal) -> None:
         """Update the current price and market data."""
+        # One clock read per tick, shared by the history and the market data
+        now = datetime.now()
         self.current_price = new_price
         self.price_history.append(new_price)
-        self.timestamps.append(datetime.now())
+        self.timestamps.append(now)
+        self._float_prices.append(float(new_price))
+        self._price_statistics = None
         
         # Update market data
         self.market_data.mark_price = new_price
         self.market_data.index_price = new_price  # Simplified: index = mark
-        self.market_data.timestamp = datetime.now()
+        self.market_data.timestamp = now
         self.market_data.update_funding_rate()
     
     def get_current_price(self) -> Decimal:
@@ -76,7 +142,7 @@ class PriceOracle:
     
     def get_price_history(self) -> List[Decimal]:
         """Get price history."""
-        return self.price_history.copy()
+        return list(self.price_history)
     
     def simulate_price_movement(
         self, 
@@ -84,21 +150,22 @@ class PriceOracle:
         trend: float = 0.0
     ) -> Decimal:
         """Simulate a single price movement."""
-        dt = Decimal('1') / Decimal('24')  # 1 hour
+        drift, shock_scale = _gbm_step_coefficients(volatility, trend)
         
         # Random shock
         z = Decimal(str(random.gauss(0, 1)))
         
         # Price change
-        drift = Decimal(str(trend)) * dt
-        diffusion = Decimal(str(volatility)) * Decimal(str(math.sqrt(float(dt)))) * z
+        diffusion = shock_scale * z
         
         price_change = self.current_price * (drift + diffusion)
         new_price = self.current_price + price_change
         
         # Ensure price stays positive and reasonable
-        new_price = max(new_price, Decimal('1000'))
-        new_price = min(new_price, Decimal('200000'))  # Cap at $200k
+        if new_price < _MIN_PRICE:
+            new_price = _MIN_PRICE
+        elif new_price > _MAX_PRICE:
+            new_price = _MAX_PRICE  # Cap at $200k
         
         self.update_price(new_price)
         return new_price
@@ -122,43 +189,45 @@ class PriceOracle:
         if len(self.price_history) < 2:
             return {}
         
-        prices = [float(p) for p in self.price_history]
-        
-        # Calculate returns
-        returns = []
-        for i in range(1, len(prices)):
-            ret = (prices[i] - prices[i-1]) / prices[i-1]
-            returns.append(ret)
-        
-        if not returns:
-            return {}
-        
-        # Calculate statistics
-        mean_return = sum(returns) / len(returns)
-        variance = sum((r - mean_return) ** 2 for r in returns) / len(returns)
-        volatility = math.sqrt(variance)
+        if self._price_statistics is None:
+            prices = self._float_prices
+            
+            # Calculate returns
+            returns = [
+                (price - previous) / previous
+                for previous, price in zip(prices, islice(prices, 1, None))
+            ]
+            
+            # Calculate statistics
+            mean_return = sum(returns) / len(returns)
+            variance = sum((r - mean_return) ** 2 for r in returns) / len(returns)
+            volatility = math.sqrt(variance)
+            
+            self._price_statistics = {
+                "current_price": float(self.current_price),
+                "price_change": float(self.current_price - self.price_history[0]),
+                "price_change_percent": float((self.current_price - self.price_history[0]) / self.price_history[0] * 100),
+                "volatility": volatility,
+                "mean_return": mean_return,
+                "min_price": min(prices),
+                "max_price": max(prices),
+                "data_points": len(prices)
+            }
         
-        return {
-            "current_price": float(self.current_price),
-            "price_change": float(self.current_price - self.price_history[0]),
-            "price_change_percent": float((self.current_price - self.price_history[0]) / self.price_history[0] * 100),
-            "volatility": volatility,
-            "mean_return": mean_return,
-            "min_price": min(prices),
-            "max_price": max(prices),
-            "data_points": len(prices)
-        }
+        return dict(self._price_statistics)
     
     def reset(self, initial_price: Decimal = Decimal('60000')) -> None:
         """Reset the price oracle."""
         self.current_price = initial_price
-        self.price_history = [initial_price]
-        self.timestamps = [datetime.now()]
+        self.price_history = deque([initial_price], maxlen=MAX_PRICE_HISTORY)
+        self.timestamps = deque([datetime.now()], maxlen=MAX_PRICE_HISTORY)
         self.market_data = MarketData(
             symbol="BTC/USD",
             mark_price=initial_price,
             index_price=initial_price
         )
+        self._float_prices = deque([float(initial_price)], maxlen=MAX_PRICE_HISTORY)
+        self._price_statistics = None
 
 
 class PriceDataGenerator:
@@ -213,20 +282,8 @@ class PriceDataGenerator:
         crash_percent: float = 0.3
     ) -> List[Decimal]:
         """Generate prices with a crash scenario."""
-        oracle = PriceOracle(initial_price)
-        prices = []
-        
-        # Generate normal prices until crash
-        for hour in range(hours):
-            if hour == crash_hour:
-                # Simulate crash
-                oracle.simulate_price_crash(crash_percent)
-            else:
-                oracle.simulate_price_movement(volatility=0.02)
-            
-            prices.append(oracle.get_current_price())
-        
-        return prices
+        path = _shock_scenario_path(float(initial_price), hours, crash_hour, 1 - crash_percent)
+        return [Decimal(str(price)) for price in path]
     
     @staticmethod
     def generate_pump_scenario(
@@ -236,17 +293,5 @@ class PriceDataGenerator:
         pump_percent: float = 0.2
     ) -> List[Decimal]:
         """Generate prices with a pump scenario."""
-        oracle = PriceOracle(initial_price)
-        prices = []
-        
-        # Generate normal prices until pump
-        for hour in range(hours):
-            if hour == pump_hour:
-                # Simulate pump
-                oracle.simulate_price_spike(pump_percent)
-            else:
-                oracle.simulate_price_movement(volatility=0.02)
-            
-            prices.append(oracle.get_current_price())
-        
-        return prices
+        path = _shock_scenario_path(float(initial_price), hours, pump_hour, 1 + pump_percent)
+        return [Decimal(str(price)) for price in path]
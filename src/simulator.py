@@ -10,7 +10,7 @@ from datetime import datetime, timedelta
 from src.models.data_models import (
     User, Order, OrderSide, OrderType, SimulationEvent, MarketData
 )
-from src.engine.position_manager import PositionManager
+from src.engine.position_manager import DEFAULT_SYMBOL, PositionManager
 from src.engine.order_book import OrderBook
 from src.engine.matching_engine import OrderMatchingEngine
 from src.engine.price_oracle import PriceOracle
@@ -36,6 +36,8 @@ class TradingSimulator:
         self.simulation_hours = 0
         self.events: List[SimulationEvent] = []
         self.simulation_log: List[Dict] = []
+        # Trades from placed orders, already flat in the trade history export shape
+        self.trade_log: List[tuple] = []
         
         # Statistics
         self.total_trades = 0
@@ -91,6 +93,7 @@ class TradingSimulator:
         
         self.simulation_hours = hours
         self.simulation_log = []
+        self.trade_log = []
         self.current_time = datetime.now()
         
         # Log simulation start
@@ -126,7 +129,7 @@ class TradingSimulator:
             self.position_manager.update_market_data(market_data)
             
             # Check for liquidations
-            liquidations = self.liquidation_engine.check_liquidations(market_data)
+            liquidations = self.liquidation_engine.check_liquidations(market_data, self.current_time)
             
             for liquidation in liquidations:
                 self.logger.log_liquidation(hour, liquidation)
@@ -155,7 +158,11 @@ class TradingSimulator:
         
         # Generate final report
         final_report = self._generate_final_report()
-        self._log_event("simulation_end", final_report)
+        # The report holds simulation_log, so logging it whole would make the
+        # log contain itself; log everything else
+        self._log_event("simulation_end", {
+            key: value for key, value in final_report.items() if key != "simulation_log"
+        })
         
         # Log simulation end
         self.logger.log_simulation_end(final_report)
@@ -199,8 +206,17 @@ class TradingSimulator:
         
         if result["valid"]:
             self.total_trades += len(result["trades"])
+            timestamp = self.current_time.isoformat()
             for trade in result["trades"]:
                 self.total_volume += Decimal(str(trade["quantity"])) * Decimal(str(trade["price"]))
+                self.trade_log.append((
+                    timestamp,
+                    self.simulation_hours,
+                    trade["buyer"],
+                    trade["seller"],
+                    trade["quantity"],
+                    trade["price"]
+                ))
         
         # Log order placement with comprehensive logging
         self.logger.log_order_placed(self.simulation_hours, event.data, result)
@@ -358,7 +374,7 @@ class TradingSimulator:
         # Calculate final user balances
         final_balances = {}
         for user_id, user in self.position_manager.users.items():
-            position = user.get_position("BTC/USD")
+            position = user.get_position(DEFAULT_SYMBOL)
             total_equity = user.collateral + user.total_realized_pnl
             
             if position:
@@ -387,7 +403,8 @@ class TradingSimulator:
             "liquidation_statistics": liquidation_stats,
             "price_statistics": price_stats,
             "final_user_balances": final_balances,
-            "simulation_log": self.simulation_log
+            "simulation_log": self.simulation_log,
+            "trade_log": self.trade_log
         }
     
     def get_current_state(self) -> Dict:
@@ -68,7 +68,7 @@ def main():
     print("\n🎉 All tools demonstrated successfully!")
     print("\n📊 Generated Files:")
     print("   - demo_results.json (simulation results)")
-    print("   - demo_results_detailed_logs.json (detailed logs)")
+    print("   - demo_results_detailed_logs.ndjson (detailed logs)")
     print("   - price_chart.png (price movement chart)")
     print("   - logs/ folder (comprehensive logging)")
     
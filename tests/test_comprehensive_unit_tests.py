@@ -21,6 +21,8 @@ from src.engine.position_manager import PositionManager
 from src.engine.funding_manager import FundingRateManager
 from src.engine.liquidation_engine import LiquidationEngine
 from src.engine.price_oracle import PriceOracle
+from src.simulator import TradingSimulator
+from main import ResultsExporter
 
 
 class TestOrderMatching:
@@ -157,6 +159,63 @@ class TestOrderMatching:
         assert not order2.is_filled
         assert sell_order.is_filled
         assert len(trades3) == 1
+    
+    def test_cancel_keeps_remaining_bids_matchable(self):
+        """Test that emptying a bid level by cancel leaves other bid levels intact."""
+        order_book = OrderBook()
+        
+        high_bid = Order(
+            user_id="user1",
+            side=OrderSide.BUY,
+            quantity=Decimal('1.0'),
+            price=Decimal('60100'),
+            leverage=5
+        )
+        
+        low_bid = Order(
+            user_id="user2",
+            side=OrderSide.BUY,
+            quantity=Decimal('1.0'),
+            price=Decimal('60000'),
+            leverage=5
+        )
+        
+        sell_order = Order(
+            user_id="user3",
+            side=OrderSide.SELL,
+            quantity=Decimal('1.0'),
+            price=Decimal('59900'),
+            leverage=5
+        )
+        
+        order_book.add_order(high_bid)
+        order_book.add_order(low_bid)
+        assert order_book.cancel_order(high_bid.id)
+        assert order_book.get_best_bid() == Decimal('60000')
+        
+        trades = order_book.add_order(sell_order)
+        
+        # Sell should match the remaining bid at its price
+        assert len(trades) == 1
+        assert trades[0].price == Decimal('60000')
+        assert low_bid.is_filled
+    
+    def test_trade_history_limit_slices_like_a_list(self):
+        """Test that get_trade_history keeps list slicing semantics for any limit."""
+        position_manager = PositionManager()
+        for user_id in ("user1", "user2"):
+            position_manager.add_user(User(user_id, Decimal('100000')))
+        matching_engine = OrderMatchingEngine(position_manager)
+        
+        for _ in range(5):
+            matching_engine.place_order(Order("user1", OrderSide.BUY, Decimal('0.1'), Decimal('60000'), 5))
+            matching_engine.place_order(Order("user2", OrderSide.SELL, Decimal('0.1'), Decimal('60000'), 5))
+        
+        history = matching_engine.get_trade_history(0)
+        assert len(history) == 5
+        
+        for limit in (2, 5, 10, -2, -10):
+            assert matching_engine.get_trade_history(limit) == history[-limit:]
 
 
 class TestPNLCalculations:
@@ -671,5 +730,51 @@ class TestIntegrationScenarios:
         assert "success" in liquidation_result or "liquidated" in liquidation_result
 
 
+
+class TestResultsExport:
+    """Test exporting real simulator results."""
+    
+    def test_export_to_json_encodes_simulator_results_directly(self):
+        """Test that simulator results export without the cleaning fallback."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            simulator = TradingSimulator(os.path.join(temp_dir, "logs"))
+            config = {
+                "users": [
+                    {"id": "user1", "collateral": 10000},
+                    {"id": "user2", "collateral": 5000}
+                ],
+                "prices": [60000, 61000, 59000],
+                "events": [
+                    {
+                        "time": 0,
+                        "action": "place_order",
+                        "data": {"user": "user1", "side": "buy", "quantity": 0.5, "price": 60000, "leverage": 5}
+                    },
+                    {
+                        "time": 1,
+                        "action": "place_order",
+                        "data": {"user": "user2", "side": "sell", "quantity": 0.5, "price": 60000, "leverage": 3}
+                    }
+                ]
+            }
+            config_file = os.path.join(temp_dir, "config.json")
+            with open(config_file, 'w') as f:
+                json.dump(config, f)
+            
+            assert simulator.load_simulation_config(config_file)["success"]
+            results = simulator.run_simulation(10)
+            
+            # The cleaning pass is only a fallback; real results must not need it
+            output_file = os.path.join(temp_dir, "results.json")
+            with patch.object(ResultsExporter, "clean_for_json", side_effect=AssertionError("cleaning fallback used")):
+                export_result = ResultsExporter.export_to_json(results, output_file)
+            
+            assert export_result["success"], export_result["message"]
+            with open(output_file) as f:
+                exported = json.load(f)
+            assert exported["simulation_summary"]["total_hours"] == 10
+            assert exported["simulation_log"][-1]["event_type"] == "simulation_end"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file